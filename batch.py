@@ -0,0 +1,131 @@
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from canonical import PuzzleIndex, canonical_key
+from grader import generate_graded, grade
+from sudoku_generator import DIFFICULTIES, board_to_string, generate_sudoku_with_solution
+
+
+# Worker task that builds count puzzles of one difficulty. Every puzzle gets its own 64-bit seed drawn from seed, so
+# any single puzzle can be rebuilt later from its seed and difficulty alone. Returns the difficulty with a list of
+# (puzzle, solution, grade, seed) tuples, where grade is the technique level from grader, and a list of the canonical
+# key of each puzzle if keys is True, or None otherwise. max_nodes and max_seconds cap each search made by the
+# generator, so one bad seed cannot stall a worker. A time budget makes which seed a puzzle ends up built from depend
+# on how fast the machine is. If graded is True, every puzzle is a unique 9x9 one that grades within the band of its
+# difficulty, built by grader.generate_graded, and unique and size are ignored.
+def generate_chunk(
+    difficulty, count, seed, unique=True, size=9, keys=False, max_nodes=None, max_seconds=None, graded=False
+):
+    seeds = random.Random(seed)
+    removed = DIFFICULTIES[difficulty]
+    puzzles = []
+    for _ in range(count):
+        puzzle_seed = seeds.getrandbits(64)
+        if graded:
+            puzzle, solution, level = generate_graded(difficulty, puzzle_seed, max_nodes, max_seconds)
+        else:
+            puzzle, solution = generate_sudoku_with_solution(size, removed, unique, puzzle_seed, max_nodes, max_seconds)
+            level = grade(puzzle).level
+        puzzles.append((puzzle, solution, level, puzzle_seed))
+    return difficulty, puzzles, [canonical_key(puzzle) for puzzle, *_ in puzzles] if keys else None
+
+
+# Generates count puzzles for each difficulty across a pool of worker processes. Work is split into chunks of
+# chunk_size puzzles, each with its own seed drawn from seed, and every chunk is yielded as a (difficulty, puzzles)
+# tuple as soon as it is finished, so callers can write results out while the rest of the batch is still running.
+#
+# With graded, puzzles are picked by grade band as in generate_chunk. If a PuzzleIndex is given as index, each puzzle's
+# canonical key is worked out in the workers and any puzzle that is the same up to symmetry as one already in the index
+# is dropped, so a chunk can come back short.
+def generate_batch(
+    count,
+    difficulties=tuple(DIFFICULTIES),
+    workers=None,
+    chunk_size=50,
+    seed=None,
+    unique=True,
+    index=None,
+    max_nodes=None,
+    max_seconds=None,
+    graded=False,
+):
+    seeds = random.Random(seed)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for difficulty in difficulties:
+            if difficulty not in DIFFICULTIES:
+                raise ValueError("unknown difficulty %r" % difficulty)
+            for start in range(0, count, chunk_size):
+                futures.append(
+                    executor.submit(
+                        generate_chunk,
+                        difficulty,
+                        min(chunk_size, count - start),
+                        seeds.getrandbits(64),
+                        unique,
+                        keys=index is not None,
+                        max_nodes=max_nodes,
+                        max_seconds=max_seconds,
+                        graded=graded,
+                    )
+                )
+        for future in as_completed(futures):
+            difficulty, puzzles, keys = future.result()
+            if index is not None:
+                puzzles = [puzzle for puzzle, key in zip(puzzles, keys) if index.add(key)]
+            yield difficulty, puzzles
+
+
+# Command line entry point. Writes one line per puzzle as "puzzle,solution,difficulty,grade,seed", with each grid
+# stored as an 81 character string.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles in parallel.")
+    parser.add_argument("-n", "--count", type=int, default=100, help="puzzles per difficulty")
+    parser.add_argument("-d", "--difficulty", nargs="+", default=list(DIFFICULTIES), choices=list(DIFFICULTIES))
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-c", "--chunk-size", type=int, default=50, help="puzzles per worker task")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed for the per-chunk seeds")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("--no-unique", action="store_true", help="skip the unique solution check")
+    parser.add_argument("--graded", action="store_true", help="pick puzzles by the grade band of their difficulty")
+    parser.add_argument("--dedupe", action="store_true", help="drop puzzles that are the same up to symmetry")
+    parser.add_argument("-i", "--index", default=None, help="file of canonical keys to dedupe against and add to")
+    parser.add_argument(
+        "--max-nodes", type=int, default=None, help="restart a board fill from a new seed after this many search nodes"
+    )
+    parser.add_argument(
+        "--max-seconds", type=float, default=None, help="restart a board fill from a new seed after this many seconds"
+    )
+    args = parser.parse_args(argv)
+
+    index = PuzzleIndex(args.index) if args.dedupe or args.index else None
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for difficulty, puzzles in generate_batch(
+            args.count,
+            args.difficulty,
+            args.workers,
+            args.chunk_size,
+            args.seed,
+            not args.no_unique,
+            index,
+            args.max_nodes,
+            args.max_seconds,
+            args.graded,
+        ):
+            for puzzle, solution, level, seed in puzzles:
+                out.write(
+                    "%s,%s,%s,%d,%d\n" % (board_to_string(puzzle), board_to_string(solution), difficulty, level, seed)
+                )
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if index is not None:
+            index.close()
+
+
+if __name__ == "__main__":
+    main()
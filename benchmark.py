@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+# pygame draws to a dummy display, so rendering can be timed without opening a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from board import Board, HEIGHT, WIDTH
+from canonical import canonical_key
+from dlx import dlx_solve
+from grader import grade
+from solver import count_solutions, solve
+from sudoku_generator import DIFFICULTIES, SudokuGenerator, generate_sudoku
+from transforms import PuzzleMultiplier
+
+# A benchmark runs setup(i) untimed for each iteration i, then times run on what setup returned. count is the default
+# number of iterations.
+Benchmark = namedtuple("Benchmark", ["name", "setup", "run", "count"])
+
+PERCENTILES = (50, 90, 99)
+
+# Puzzles shared by the solver benchmarks, built once per difficulty with fixed seeds so every run times the same work
+PUZZLES = {}
+
+
+# returns 50 puzzles of difficulty, the same ones every time
+def puzzles(difficulty):
+    if difficulty not in PUZZLES:
+        PUZZLES[difficulty] = [generate_sudoku(9, DIFFICULTIES[difficulty], True, seed) for seed in range(50)]
+    return PUZZLES[difficulty]
+
+
+# returns the puzzle of difficulty used by iteration i
+def puzzle_for(difficulty, i):
+    return puzzles(difficulty)[i % 50]
+
+
+# Returns a Board drawn on a dummy display, with a fixed puzzle so every run starts from the same state.
+def make_board():
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    board = Board(WIDTH, HEIGHT, screen, "Medium", seed=0)
+    board.draw()
+    return board
+
+
+# returns the cell (row, col) picked by iteration i, skipping cells given at the start so moves are allowed there
+def open_cell(board, i):
+    cells = [k for k in range(81) if not board.givens[k]]
+    return divmod(cells[i * 7 % len(cells)], 9)
+
+
+# places a number in an open cell of board, so the queries below have a board in play to look at
+def play(board, i):
+    row, col = open_cell(board, i)
+    board.select(row, col)
+    board.place_number(i % 9 + 1)
+    return board
+
+
+# returns the list of every benchmark
+def benchmarks():
+    result = [
+        Benchmark("generator/fill_values", lambda i: SudokuGenerator(9, 0, seed=i), lambda g: g.fill_values(), 200),
+    ]
+
+    for difficulty, removed in DIFFICULTIES.items():
+
+        def filled(i, removed=removed):
+            sudoku = SudokuGenerator(9, removed, True, seed=i)
+            sudoku.fill_values()
+            return sudoku
+
+        result.append(Benchmark("generator/remove_cells/" + difficulty, filled, lambda g: g.remove_cells(), 50))
+        result.append(
+            Benchmark(
+                "generate_sudoku/" + difficulty,
+                lambda i: i,
+                lambda i, removed=removed: generate_sudoku(9, removed, True, i),
+                50,
+            )
+        )
+
+    for difficulty in DIFFICULTIES:
+
+        def setup(i, difficulty=difficulty):
+            return puzzle_for(difficulty, i)
+
+        result += [
+            Benchmark("solver/solve/" + difficulty, setup, solve, 200),
+            Benchmark("solver/count_solutions/" + difficulty, setup, count_solutions, 200),
+            Benchmark("dlx/solve/" + difficulty, setup, dlx_solve, 200),
+            Benchmark("grader/grade/" + difficulty, setup, grade, 200),
+            Benchmark("canonical/key/" + difficulty, setup, canonical_key, 200),
+        ]
+
+    multiplier = None
+
+    # the multiplier and its seed puzzles are built the first time it is used, so filtered runs skip the generation
+    def get_multiplier():
+        nonlocal multiplier
+        if multiplier is None:
+            multiplier = PuzzleMultiplier(seed=0)
+            multiplier.seeds_for("Hard")
+        return multiplier
+
+    result.append(Benchmark("transforms/take", lambda i: get_multiplier(), lambda m: m.take("Hard"), 2000))
+
+    board = None
+
+    # the board is built the first time a board benchmark runs, so filtered runs without one never open pygame
+    def get_board():
+        nonlocal board
+        if board is None:
+            board = make_board()
+        return board
+
+    def select(i):
+        return get_board(), open_cell(get_board(), i)
+
+    def selected(i):
+        board = get_board()
+        board.select(*open_cell(board, i))
+        return board, i % 9 + 1
+
+    result += [
+        Benchmark("board/select", select, lambda args: args[0].select(*args[1]), 2000),
+        Benchmark("board/place_number", selected, lambda args: args[0].place_number(args[1]), 2000),
+        Benchmark("board/is_full", lambda i: play(get_board(), i), lambda b: b.is_full(), 2000),
+        Benchmark("board/check_board", lambda i: play(get_board(), i), lambda b: b.check_board(), 2000),
+        Benchmark("render/cell_draw", lambda i: get_board().cells[i % 81], lambda cell: cell.draw(), 2000),
+        Benchmark("render/board_draw", lambda i: get_board(), lambda b: b.draw(), 200),
+    ]
+    return result
+
+
+# Times count iterations of benchmark after a few untimed warmup runs. Returns its statistics in seconds and its
+# throughput in runs per second.
+def measure(benchmark, count, warmup=3):
+    for i in range(warmup):
+        benchmark.run(benchmark.setup(i))
+    samples = []
+    for i in range(count):
+        arg = benchmark.setup(i)
+        start = time.perf_counter()
+        benchmark.run(arg)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    total = sum(samples)
+    stats = {"count": count, "mean": total / count, "min": samples[0], "max": samples[-1]}
+    for percentile in PERCENTILES:
+        stats["p%d" % percentile] = samples[min(count - 1, count * percentile // 100)]
+    stats["throughput"] = count / total if total else float("inf")
+    return stats
+
+
+# returns where and on what the benchmarks ran, so saved results can be matched to a commit
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pygame": pygame.version.ver,
+    }
+
+
+# formats a duration in seconds with a unit that suits it
+def format_time(seconds):
+    if seconds >= 1:
+        return "%.2f s" % seconds
+    if seconds >= 1e-3:
+        return "%.2f ms" % (seconds * 1e3)
+    return "%.1f us" % (seconds * 1e6)
+
+
+# Compares results against a baseline from an earlier run. Returns the names of the benchmarks whose median time grew
+# by more than threshold, as a fraction of the baseline.
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        change = stats["p50"] / old["p50"] - 1 if old["p50"] else 0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            "%-40s %10s -> %10s %+7.1f%%%s"
+            % (name, format_time(old["p50"]), format_time(stats["p50"]), change * 100, flag)
+        )
+    return regressions
+
+
+# Command line entry point. Prints a table of results, and optionally saves them as JSON and compares them with an
+# earlier run. Exits with status 1 if any benchmark regressed.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Sudoku generation, solving and rendering.")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("-s", "--scale", type=float, default=1.0, help="multiply every iteration count by this")
+    parser.add_argument("-o", "--output", default=None, help="JSON file to save results to")
+    parser.add_argument("-c", "--compare", default=None, help="JSON file of earlier results to compare against")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1, help="median slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print("%-40s %10s %10s %10s %10s %12s" % ("benchmark", "p50", "p90", "p99", "max", "runs/s"))
+    for benchmark in benchmarks():
+        if args.filter not in benchmark.name:
+            continue
+        stats = measure(benchmark, max(1, int(benchmark.count * args.scale)))
+        results[benchmark.name] = stats
+        print(
+            "%-40s %10s %10s %10s %10s %12.1f"
+            % (
+                benchmark.name,
+                format_time(stats["p50"]),
+                format_time(stats["p90"]),
+                format_time(stats["p99"]),
+                format_time(stats["max"]),
+                stats["throughput"],
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        print()
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
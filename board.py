@@ -1,9 +1,7 @@
-import copy
 import pygame
 import sys
 from cell import Cell
-from sudoku_generator import generate_sudoku
-from sudoku_generator import SudokuGenerator
+from game import Game
 
 # Define constants
 WIDTH = 540
@@ -15,165 +13,108 @@ LINE_COLOR = (237, 150, 36)
 RED = (255, 0, 0)
 
 
-class Board:
-    def __init__(self, width, height, screens, difficulty):
+# Draws a Game with pygame. Every change to a cell redraws just that cell and records its rect in self.dirty.
+class Board(Game):
+    # If a PuzzlePool or PuzzleBank is given as pool, the puzzle is taken from it instead of being generated here.
+    # size is the row length of the board and can be any square number, such as 4, 9, 16 or 25. A seed makes the
+    # generated puzzle reproducible.
+    def __init__(self, width, height, screens, difficulty, pool=None, size=9, seed=None):
         self.width = width
         self.height = height
         self.screen = screens
-        self.difficulty = difficulty
+        self.cell_size = width // size
 
-        # Determined how many cells will be removed based on the difficulty selected.
-        if self.difficulty == "Easy":
-            removed_cell = 30
-        elif self.difficulty == "Medium":
-            removed_cell = 40
-        else:
-            removed_cell = 50
-
-        # Defines 3 different lists containing the 2D board, the solution for the sudoku, and the state of the
-        # original board when the game is first started.
-        sudoku = SudokuGenerator(9, removed_cell)
-        sudoku.fill_values()
-        self.solution = copy.deepcopy(sudoku.get_board())
-        sudoku.remove_cells()
-        self.board = sudoku.get_board()
-        self.original_board = copy.deepcopy(self.board)
+        # screen areas drawn since the display was last updated
+        self.dirty = []
+
+        # redraws made while the game state is being built are skipped, and the Cell objects are created from it after
+        self.cells = None
+
+        # whether empty cells show their candidates as pencil marks
+        self.show_candidates = False
+
+        super().__init__(difficulty, pool, size, seed)
         self.cells = [
-            Cell(self.board[i][j], i, j, self.screen)
-            for i in range(0, 9)
-            for j in range(0, 9)
+            Cell(self.values[k], k // size, k % size, self.screen, self.cell_size, self.box_length)
+            for k in range(size * size)
         ]
 
+    # Returns the Cell object at (row, col). Cells are stored row by row, so this is a direct index.
+    def cell(self, row, col):
+        return self.cells[self.index(row, col)]
+
+    # copies the state of cell k from the game into its Cell object, then redraws it and records the area it covers
+    def redraw(self, k):
+        if self.cells is None:
+            return
+        i = self.cells[k]
+        i.set_cell_values(self.values[k])
+        i.set_sketched_value(self.sketches[k])
+        i.selected = k == self.selected
+        i.conflict = bool(self.conflict_flags[k])
+        i.candidates = self.candidates[k] if self.show_candidates else 0
+        self.dirty.append(i.draw())
+
+    # pencil marks only need repainting while they are shown
+    def candidates_changed(self, k):
+        if self.show_candidates:
+            self.redraw(k)
+
+    # Turns the pencil marks of every empty cell on or off.
+    def toggle_candidates(self):
+        self.show_candidates = not self.show_candidates
+        for k in range(self.size * self.size):
+            if not self.values[k]:
+                self.redraw(k)
+
     def draw(self):
+        square_size = self.cell_size * self.box_length
+        board_width = self.cell_size * self.size
+
         # Draws horizontal lines of Sudoku Grid
-        for i in range(1, 3):
+        for i in range(1, self.box_length):
             pygame.draw.line(
                 self.screen,
                 LINE_COLOR,
-                (0, i * SQUARE_SIZE),
-                (WIDTH, i * SQUARE_SIZE),
+                (0, i * square_size),
+                (board_width, i * square_size),
                 LINE_WIDTH,
             )
 
         # Draws vertical lines of Sudoku Grid
-        for i in range(1, 3):
+        for i in range(1, self.box_length):
             pygame.draw.line(
                 self.screen,
                 LINE_COLOR,
-                (i * SQUARE_SIZE, 0),
-                (i * SQUARE_SIZE, WIDTH),
+                (i * square_size, 0),
+                (i * square_size, board_width),
                 LINE_WIDTH,
             )
 
         # Draws each cell of the sudoku board from the cell list containing Cell objects.
         for i in self.cells:
             i.draw()
+        self.dirty = []
 
-    def select(self, row, col):
-        # Makes sure any previously selected cell will be unselected when a new cell is selected.
-        for i in self.cells:
-            i.selected = False
-            i.draw()
-
-        # Marks the cell at (row, col) in the board as the current selected cell. This cell is denoted in red.
-        for i in self.cells:
-            if i.row == row and i.col == col:
-                i.selected = True
-                i.draw()
+    # Pushes only the areas drawn since the last call to the display, instead of flipping the whole screen. After a full
+    # draw() the caller flips the display itself.
+    def update_display(self):
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
 
     # If a tuple of (x,y) coordinates is within the displayed board, this function returns a tuple of the
     # (row, col) of the cell which was clicked. Otherwise, this function returns None.
     def click(self, x, y):
-        row = y // 60
-        col = x // 60
+        row = y // self.cell_size
+        col = x // self.cell_size
         i = (row, col)
 
-        if (8 >= row >= 0) and (8 >= col >= 0):
+        if (self.size > row >= 0) and (self.size > col >= 0):
             return i
         else:
             return None
 
-    def clear(self):
-        # Clears the cell value of the cell that is currently being selected. Note: The user can only clear the value
-        # and sketch value of a cell if they are filled by themselves and is not a cell that has been randomly
-        # generated (value was already given at the beginning).
-        for i in self.cells:
-            if i.selected and self.original_board[i.row][i.col] == 0:
-                i.set_cell_values(0)
-                i.draw()
-        self.update_board()
-
-    # Sets the sketched value of the current selected cell equal to user entered value. It will be displayed in the
-    # top-left corner of the cell using the draw() function.
-    def sketch(self, value):
-        for i in self.cells:
-            if i.selected and self.original_board[i.row][i.col] == 0 and not i.value:
-                i.set_sketched_value(value)
-
-    # Sets the value of the current selected cell equal to user entered value. Called when the user presses the Enter
-    # key. This will only be done if the selected cell was originally blank or equal to 0.
-    def place_number(self, value=None):
-        for i in self.cells:
-            if i.selected and self.original_board[i.row][i.col] == 0:
-                i.set_cell_values(value or i.sketched_value)
-                i.sketched_value = 0
-                i.draw()
-        self.update_board()
-
-    # Resets all cells in the board to their original values.
-    def reset_to_original(self):
-        original_cells = [
-            Cell(self.original_board[i][j], i, j, self.screen)
-            for i in range(0, 9)
-            for j in range(0, 9)
-        ]
-
-        for i in range(0, len(original_cells)):
-            self.cells[i].set_cell_values(original_cells[i].value)
-            self.cells[i].set_sketched_value(original_cells[i].sketched_value)
-            self.cells[i].selected = False
-            self.cells[i].draw()
-
-        self.update_board()
-
-    # Returns a Boolean value indicating whether the board is full or not.
-    def is_full(self):
-        self.update_board()
-
-        for i in range(0, 9):
-            for j in range(0, 9):
-                if self.board[i][j] == 0:
-                    return False
-        return True
-
-    # Updates the underlying 2D board with the values in all cells.
-    def update_board(self):
-        count = 0
-        for i in range(0, 9):
-            for j in range(0, 9):
-                self.board[i][j] = self.cells[count].value
-                count += 1
-
-    # Finds an empty cell and returns its row and col as a tuple (x, y).
-    def find_empty(self):
-        self.update_board()
-
-        for i in range(0, 9):
-            for j in range(0, 9):
-                if self.board[i][j] == 0:
-                    return i, j
-
-    # Check whether the Sudoku board is solved correctly.
-    def check_board(self):
-        if not self.is_full():
-            return False
-        for i in range(0, 9):
-            for j in range(0, 9):
-                if self.board[i][j] != self.solution[i][j]:
-                    return False
-
-        return True
-
 # Used to test the board class:
 
 # # Initialize Pygame
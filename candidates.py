@@ -0,0 +1,61 @@
+import math
+
+
+# Keeps one bitmask per row, column and box of the board. Bit n of a mask is set when the digit n has already been
+# placed in that unit, so checking a move is a single AND and the candidates of a cell are a single lookup.
+class Candidates:
+
+    # class constructor to create empty masks for a board with the given row length
+    def __init__(self, row_length):
+        self.row_length = row_length
+        self.box_length = int(math.sqrt(row_length))
+        self.full = ((1 << row_length) - 1) << 1
+        self.rows = [0] * row_length
+        self.cols = [0] * row_length
+        self.boxes = [0] * row_length
+        self.box_of = [
+            [(row // self.box_length) * self.box_length + col // self.box_length for col in range(row_length)]
+            for row in range(row_length)
+        ]
+
+    # loads the masks from a 2D python list of numbers, where 0 marks an empty cell
+    def load(self, board):
+        self.rows = [0] * self.row_length
+        self.cols = [0] * self.row_length
+        self.boxes = [0] * self.row_length
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                if board[row][col]:
+                    self.place(row, col, board[row][col])
+
+    # records num as placed at (row, col)
+    def place(self, row, col, num):
+        bit = 1 << num
+        self.rows[row] |= bit
+        self.cols[col] |= bit
+        self.boxes[self.box_of[row][col]] |= bit
+
+    # records num as removed from (row, col), undoing a previous place
+    def remove(self, row, col, num):
+        bit = ~(1 << num)
+        self.rows[row] &= bit
+        self.cols[col] &= bit
+        self.boxes[self.box_of[row][col]] &= bit
+
+    # Determines if it is valid to enter num at (row, col)
+    def is_valid(self, row, col, num):
+        return not (self.rows[row] | self.cols[col] | self.boxes[self.box_of[row][col]]) & (1 << num)
+
+    # returns the bitmask of every digit that can still be entered at (row, col)
+    def get(self, row, col):
+        return self.full & ~(self.rows[row] | self.cols[col] | self.boxes[self.box_of[row][col]])
+
+
+# returns the digits contained in a candidate bitmask, from smallest to largest
+def digits(mask):
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(low.bit_length() - 1)
+        mask ^= low
+    return result
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import itertools
+import math
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sudoku_generator import string_to_board
+
+# keys are stored on disk as little-endian unsigned 64-bit integers
+KEY = struct.Struct("<Q")
+
+# The fewest givens a 9x9 puzzle with a single solution can have. The partial transforms canonical_form keeps grow
+# without bound as a board empties, so sparser boards, scaled to their size, are refused, as are boards that still
+# need more than MAX_STATES partial transforms at once. Generated puzzles stay below a few thousand.
+MIN_GIVENS = 17
+MAX_STATES = 50000
+
+
+# Yields every column order that gives the smallest relabeled row for row: stacks with more empty cells go first, and
+# empty cells go first within a stack. Filled cells always relabel to 1, 2, 3, ... in order, so their order does not
+# matter for this row and every arrangement of them is kept for the rows below to decide.
+def column_orders(row, box_length):
+    stacks = []
+    for stack in range(box_length):
+        columns = range(stack * box_length, (stack + 1) * box_length)
+        empty = [col for col in columns if not row[col]]
+        filled = [col for col in columns if row[col]]
+        stacks.append((len(empty), empty, filled))
+
+    for order in itertools.permutations(stacks):
+        if any(order[i][0] < order[i + 1][0] for i in range(box_length - 1)):
+            continue
+        parts = []
+        for _, empty, filled in order:
+            parts.append(itertools.permutations(empty))
+            parts.append(itertools.permutations(filled))
+        for choice in itertools.product(*parts):
+            yield [col for part in choice for col in part]
+
+
+# Reads row through the column order cols, renaming each number to the order it first appeared in across the rows read
+# so far. labels maps old numbers to new ones (0 for not yet seen) and is updated in place. Returns the relabeled row
+# and the next unused label.
+def relabel(row, cols, labels, next_label):
+    out = []
+    for col in cols:
+        num = row[col]
+        if num and not labels[num]:
+            labels[num] = next_label
+            next_label += 1
+        out.append(labels[num])
+    return out, next_label
+
+
+# Returns the canonical form of a board: of every board that can be reached from it by transposing, reordering bands
+# and stacks, reordering rows within a band or columns within a stack, and renaming the numbers, the one that is
+# smallest when read row by row (empty cells count as 0, and numbers are named in the order they first appear). Two
+# puzzles are the same up to symmetry exactly when their canonical forms are equal. Raises ValueError for a board with
+# fewer than MIN_GIVENS givens, scaled to its size, or one that needs more than MAX_STATES partial transforms.
+#
+# The form is built one row at a time, keeping only the partial transforms that give the smallest rows so far, so most
+# of the 2 * 6^8 row and column orders are never looked at.
+def canonical_form(board):
+    size = len(board)
+    box_length = math.isqrt(size)
+    givens = sum(1 for row in board for num in row if num)
+    if givens < MIN_GIVENS * size * size // 81:
+        raise ValueError("%d givens are too few to put in canonical form" % givens)
+    grids = (board, [list(col) for col in zip(*board)])
+
+    # The first row only depends on how many empty cells each stack holds, so it picks the transpose and source row: the
+    # more empty cells in the first stacks, the more zeros the row starts with.
+    best = None
+    starts = []
+    for grid in grids:
+        for r in range(size):
+            empty = sorted(
+                (
+                    sum(1 for col in range(stack * box_length, (stack + 1) * box_length) if not grid[r][col])
+                    for stack in range(box_length)
+                ),
+                reverse=True,
+            )
+            if best is None or empty > best:
+                best = empty
+                starts = []
+            if empty == best:
+                starts.append((grid, r))
+
+    # Each state is a partial transform: the grid, a column order, the rows left in the current band, the bands not
+    # yet used, and the labels given so far.
+    form = []
+    states = []
+    for grid, r in starts:
+        band = r // box_length
+        band_rows = [row for row in range(band * box_length, (band + 1) * box_length) if row != r]
+        bands = [other for other in range(box_length) if other != band]
+        for cols in column_orders(grid[r], box_length):
+            labels = [0] * (size + 1)
+            out, next_label = relabel(grid[r], cols, labels, 1)
+            states.append((grid, cols, band_rows, bands, labels, next_label))
+    form.append(out)
+    check_states(states)
+
+    for _ in range(1, size):
+        best = None
+        next_states = []
+        for grid, cols, band_rows, bands, labels, next_label in states:
+            if band_rows:
+                choices = [(r, [row for row in band_rows if row != r], bands) for r in band_rows]
+            else:
+                choices = [
+                    (r, [row for row in range(band * box_length, (band + 1) * box_length) if row != r],
+                     [other for other in bands if other != band])
+                    for band in bands
+                    for r in range(band * box_length, (band + 1) * box_length)
+                ]
+            for r, rest, rest_bands in choices:
+                new_labels = labels[:]
+                out, new_next = relabel(grid[r], cols, new_labels, next_label)
+                if best is None or out < best:
+                    best = out
+                    next_states = []
+                if out == best:
+                    next_states.append((grid, cols, rest, rest_bands, new_labels, new_next))
+        states = next_states
+        check_states(states)
+        form.append(best)
+    return form
+
+
+# raises ValueError if canonical_form is keeping too many partial transforms to finish in reasonable time
+def check_states(states):
+    if len(states) > MAX_STATES:
+        raise ValueError("more than %d partial transforms to put in canonical form" % MAX_STATES)
+
+
+# Returns a 64-bit key for the canonical form of a board, so puzzles that are the same up to symmetry share a key.
+def canonical_key(board):
+    data = bytes(num for row in canonical_form(board) for num in row)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=KEY.size).digest(), "little")
+
+
+# Set of canonical keys for rejecting duplicate puzzles. If path is given, the keys already stored there are loaded and
+# every new key is appended to it, so the index carries over between runs and banks.
+class PuzzleIndex:
+
+    # class constructor that loads the keys stored in path, if any, and opens it for appending
+    def __init__(self, path=None):
+        self.keys = set()
+        self.file = None
+        if path:
+            if os.path.exists(path):
+                stored = array("Q")
+                with open(path, "rb") as file:
+                    data = file.read()
+                stored.frombytes(data[: len(data) - len(data) % KEY.size])
+                if sys.byteorder != "little":
+                    stored.byteswap()
+                self.keys.update(stored)
+            self.file = open(path, "ab")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    # Adds key to the index. Returns False if it was already there, meaning the puzzle is a duplicate.
+    def add(self, key):
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        if self.file is not None:
+            self.file.write(KEY.pack(key))
+        return True
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# Worker task that returns the canonical key of the puzzle in the first field of a text line, or None for a blank line
+# or one that does not hold a puzzle with enough givens.
+def line_key(line):
+    puzzle = line.split(",", 1)[0].strip()
+    try:
+        return canonical_key(string_to_board(puzzle)) if puzzle else None
+    except ValueError:
+        return None
+
+
+# worker task that returns the key of every line in a chunk of lines
+def chunk_keys(lines):
+    return [line_key(line) for line in lines]
+
+
+# Copies the lines of a puzzle text file, in the format read by puzzle_bank.import_text, to output, leaving out every
+# puzzle that is the same up to symmetry as an earlier one or as one already in index. Keys are worked out across a pool
+# of worker processes, with at most two chunks of lines per worker in flight, so memory stays constant however long the
+# file is. Lines that are not puzzles, or have too few givens to key, are skipped. Returns the number of lines kept, the
+# number dropped as duplicates and the number skipped.
+def dedupe_text(text_path, output_path, index=None, workers=None, chunk_size=1000):
+    index = index if index is not None else PuzzleIndex()
+    workers = workers or os.cpu_count()
+    kept = dropped = skipped = 0
+
+    def write(lines, keys):
+        nonlocal kept, dropped, skipped
+        for line, key in zip(lines, keys):
+            if key is None:
+                skipped += line.strip() != ""
+                continue
+            if index.add(key):
+                out.write(line)
+                kept += 1
+            else:
+                dropped += 1
+
+    with open(text_path) as text, open(output_path, "w") as out, ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            lines = list(itertools.islice(text, chunk_size))
+            if not lines:
+                break
+            pending.append((lines, executor.submit(chunk_keys, lines)))
+            if len(pending) >= 2 * workers:
+                lines, future = pending.popleft()
+                write(lines, future.result())
+        while pending:
+            lines, future = pending.popleft()
+            write(lines, future.result())
+    return kept, dropped, skipped
+
+
+# Command line entry point for removing duplicate puzzles from a text file
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove Sudoku puzzles that are the same up to symmetry.")
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    parser.add_argument("-i", "--index", default=None, help="file of canonical keys to check against and add to")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-c", "--chunk-size", type=int, default=1000, help="puzzles per worker task")
+    args = parser.parse_args(argv)
+
+    with PuzzleIndex(args.index) as index:
+        kept, dropped, skipped = dedupe_text(args.source, args.destination, index, args.workers, args.chunk_size)
+    print("%d puzzles kept, %d duplicates dropped, %d lines skipped" % (kept, dropped, skipped))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,16 +11,57 @@ LINE_COLOR = (237, 150, 36)
 RED = (255, 0, 0)
 MIXED = (119, 75, 88)
 
+# Fonts and rendered text shared by every cell. Loading a font reads it from disk and rendering rasterizes the text,
+# so both are done once per size and once per (text, size, colour) and then reused.
+FONTS = {}
+GLYPHS = {}
+
+
+# returns the default font at the given size, loading it the first time it is asked for
+def get_font(size):
+    font = FONTS.get(size)
+    if font is None:
+        font = FONTS[size] = pygame.font.Font(None, size)
+    return font
+
+
+# returns a surface with text rendered in the default font at the given size and colour
+def get_glyph(text, size, color):
+    key = (text, size, color)
+    glyph = GLYPHS.get(key)
+    if glyph is None:
+        glyph = GLYPHS[key] = get_font(size).render(text, 1, color)
+    return glyph
+
 
 # Define the Cell class
+# cell_size is the width of the cell in pixels, and box_length the number of cells along one side of a box.
+# candidates is a bitmask of the pencil marks to draw in an empty cell, with bit v set for number v.
 class Cell:
-    def __init__(self, value, row, col, screen):
+    __slots__ = (
+        "value",
+        "row",
+        "col",
+        "screen",
+        "cell_size",
+        "box_length",
+        "sketched_value",
+        "selected",
+        "conflict",
+        "candidates",
+    )
+
+    def __init__(self, value, row, col, screen, cell_size=SQUARE_SIZE, box_length=3):
         self.value = value
         self.row = row
         self.col = col
         self.screen = screen
+        self.cell_size = cell_size
+        self.box_length = box_length
         self.sketched_value = 0
         self.selected = False
+        self.conflict = False
+        self.candidates = 0
 
     def set_cell_values(self, value):
         self.value = value
@@ -28,10 +69,10 @@ class Cell:
     def set_sketched_value(self, value):
         self.sketched_value = value
 
+    # Draws the cell and returns the rect it covers, so callers can push just that area to the display
     def draw(self):
-        cell_size = SQUARE_SIZE
-        chip_font = pygame.font.Font(None, 60)
-        sketch_font = pygame.font.Font(None, 45)
+        cell_size = self.cell_size
+        box_length = self.box_length
 
         # Draw cell background
         pygame.draw.rect(
@@ -48,19 +89,19 @@ class Cell:
             LINE_WIDTH,
         )
 
-        # Draw thick outlines if cell is in the bottom corner of a larger square
-        if self.row % 3 == 2 and self.col % 3 == 2:
-            pygame.draw.rect(
-                self.screen,
-                LINE_COLOR,
-                (
-                    (self.col - 2) * cell_size,
-                    (self.row - 2) * cell_size,
-                    cell_size * 3,
-                    cell_size * 3,
-                ),
-                LINE_WIDTH * 5,
-            )
+        # Draw the part of the thick box outline that runs along the edges of this cell, so a cell can be redrawn on
+        # its own without erasing the outline of its box
+        thick = LINE_WIDTH * 5
+        x = self.col * cell_size
+        y = self.row * cell_size
+        if self.row % box_length == 0:
+            pygame.draw.rect(self.screen, LINE_COLOR, (x, y, cell_size, thick))
+        if self.row % box_length == box_length - 1:
+            pygame.draw.rect(self.screen, LINE_COLOR, (x, y + cell_size - thick, cell_size, thick))
+        if self.col % box_length == 0:
+            pygame.draw.rect(self.screen, LINE_COLOR, (x, y, thick, cell_size))
+        if self.col % box_length == box_length - 1:
+            pygame.draw.rect(self.screen, LINE_COLOR, (x + cell_size - thick, y, thick, cell_size))
 
         # Draw the selected cell in red
         if self.selected:
@@ -73,18 +114,18 @@ class Cell:
 
         # Draw the cell value
         if self.value:
-            chip_surf = chip_font.render(str(self.value), 1, LINE_COLOR)
+            chip_surf = get_glyph(str(self.value), cell_size, RED if self.conflict else LINE_COLOR)
             chip_rect = chip_surf.get_rect(
                 center=(
                     self.col * cell_size + cell_size // 2,
-                    self.row * cell_size + cell_size // 2 + 3,
+                    self.row * cell_size + cell_size // 2 + cell_size // 20,
                 )
             )
             self.screen.blit(chip_surf, chip_rect)
 
         # Draw the cell sketched value
         if self.sketched_value:
-            sketch_surf = sketch_font.render(str(self.sketched_value), 1, MIXED)
+            sketch_surf = get_glyph(str(self.sketched_value), cell_size * 3 // 4, MIXED)
             sketch_rect = sketch_surf.get_rect(
                 center=(
                     self.col * cell_size + cell_size // 3,
@@ -93,6 +134,27 @@ class Cell:
             )
             self.screen.blit(sketch_surf, sketch_rect)
 
+        # Draw the pencil marks of an empty cell in a box_length x box_length grid inside the box outline, with number
+        # v in position v - 1
+        elif self.candidates and not self.value:
+            mark_size = (cell_size - 2 * thick) // box_length
+            mask = self.candidates
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                num = bit.bit_length() - 1
+                mark_row, mark_col = divmod(num - 1, box_length)
+                mark_surf = get_glyph(str(num), mark_size, MIXED)
+                mark_rect = mark_surf.get_rect(
+                    center=(
+                        x + thick + mark_col * mark_size + mark_size // 2,
+                        y + thick + mark_row * mark_size + mark_size // 2,
+                    )
+                )
+                self.screen.blit(mark_surf, mark_rect)
+
+        return pygame.Rect(x, y, cell_size, cell_size)
+
 
 # # Initialize Pygame
 # pygame.init()
@@ -0,0 +1,207 @@
+import math
+from candidates import Candidates, digits
+
+
+# Exact-cover solver using Knuth's Algorithm X with Dancing Links. Every (row, col, num) placement is a row of the
+# cover matrix that satisfies four constraints: the cell is filled, and num appears once in its row, column and box.
+# The links are kept in flat integer lists instead of node objects, and the search uses an explicit stack so it can
+# be consumed lazily as a generator.
+class DancingLinks:
+
+    # class constructor that copies the 2D python list of numbers in the same format as get_board()
+    def __init__(self, board):
+        self.row_length = len(board)
+        self.box_length = int(math.sqrt(self.row_length))
+        self.board = [list(row) for row in board]
+
+    # returns a solved copy of the board, or None if it has no solution
+    def solve(self):
+        for solution in self.solutions():
+            return solution
+        return None
+
+    # returns the number of solutions of the board, stopping as soon as limit solutions have been found
+    def count(self, limit=2):
+        found = 0
+        for _ in self.solutions():
+            found += 1
+            if found >= limit:
+                break
+        return found
+
+    # yields every solution of the board as a new 2D python list
+    def solutions(self):
+        matrix = self.build()
+        if matrix is None:
+            return
+        left, right, up, down, column, size, placement = matrix
+
+        def cover(c):
+            right[left[c]] = right[c]
+            left[right[c]] = left[c]
+            i = down[c]
+            while i != c:
+                j = right[i]
+                while j != i:
+                    down[up[j]] = down[j]
+                    up[down[j]] = up[j]
+                    size[column[j]] -= 1
+                    j = right[j]
+                i = down[i]
+
+        def uncover(c):
+            i = up[c]
+            while i != c:
+                j = left[i]
+                while j != i:
+                    size[column[j]] += 1
+                    down[up[j]] = j
+                    up[down[j]] = j
+                    j = left[j]
+                i = up[i]
+            right[left[c]] = c
+            left[right[c]] = c
+
+        def choose(r):
+            j = right[r]
+            while j != r:
+                cover(column[j])
+                j = right[j]
+
+        def unchoose(r):
+            j = left[r]
+            while j != r:
+                uncover(column[j])
+                j = left[j]
+
+        stack = []
+        while True:
+            backtrack = True
+            if right[0] == 0:
+                solution = [list(row) for row in self.board]
+                for r in stack:
+                    row, col, num = placement[r]
+                    solution[row][col] = num
+                yield solution
+            else:
+                # picks the column with the fewest remaining rows
+                best = right[0]
+                c = right[best]
+                while c != 0 and size[best] > 1:
+                    if size[c] < size[best]:
+                        best = c
+                    c = right[c]
+                cover(best)
+                r = down[best]
+                if r != best:
+                    stack.append(r)
+                    choose(r)
+                    backtrack = False
+                else:
+                    uncover(best)
+
+            # moves on to the next row of the most recent column, unwinding columns that have run out of rows
+            while backtrack:
+                if not stack:
+                    return
+                r = stack.pop()
+                unchoose(r)
+                c = column[r]
+                r = down[r]
+                if r != c:
+                    stack.append(r)
+                    choose(r)
+                    backtrack = False
+                else:
+                    uncover(c)
+
+    # Builds the linked cover matrix for the empty cells of the board. Constraints already satisfied by the givens are
+    # left out, and only placements allowed by the givens become rows. Returns None if the givens conflict.
+    def build(self):
+        n = self.row_length
+        candidates = Candidates(n)
+        for row in range(n):
+            for col in range(n):
+                num = self.board[row][col]
+                if num:
+                    if not candidates.is_valid(row, col, num):
+                        return None
+                    candidates.place(row, col, num)
+
+        # node 0 is the root, followed by one header node per constraint the givens leave open. A constraint with no
+        # rows is kept so the search fails on it immediately.
+        left, right, up, down, column, size = [0], [0], [0], [0], [0], [0]
+        placement = [None]
+        header = {}
+
+        def add_header(constraint):
+            c = len(left)
+            header[constraint] = c
+            left.append(left[0])
+            right.append(0)
+            right[left[0]] = c
+            left[0] = c
+            up.append(c)
+            down.append(c)
+            column.append(c)
+            size.append(0)
+            placement.append(None)
+
+        for row in range(n):
+            for col in range(n):
+                if not self.board[row][col]:
+                    add_header(row * n + col)
+        for unit in range(n):
+            for num in range(1, n + 1):
+                bit = 1 << num
+                if not candidates.rows[unit] & bit:
+                    add_header(n * n + unit * n + num - 1)
+                if not candidates.cols[unit] & bit:
+                    add_header(2 * n * n + unit * n + num - 1)
+                if not candidates.boxes[unit] & bit:
+                    add_header(3 * n * n + unit * n + num - 1)
+
+        rows = [
+            (row, col, num, candidates.box_of[row][col])
+            for row in range(n)
+            for col in range(n)
+            if not self.board[row][col]
+            for num in digits(candidates.get(row, col))
+        ]
+        for row, col, num, box in rows:
+            first = len(left)
+            constraints = (
+                row * n + col,
+                n * n + row * n + num - 1,
+                2 * n * n + col * n + num - 1,
+                3 * n * n + box * n + num - 1,
+            )
+            for k, constraint in enumerate(constraints):
+                c = header[constraint]
+                node = first + k
+                left.append(first + (k - 1) % 4)
+                right.append(first + (k + 1) % 4)
+                up.append(up[c])
+                down.append(c)
+                down[up[c]] = node
+                up[c] = node
+                column.append(c)
+                size[c] += 1
+                placement.append((row, col, num))
+
+        return left, right, up, down, column, size, placement
+
+
+# returns a solved copy of a 2D python list board using Dancing Links, or None if it has no solution
+def dlx_solve(board):
+    return DancingLinks(board).solve()
+
+
+# returns the number of solutions of a 2D python list board using Dancing Links, counting no further than limit
+def dlx_count(board, limit=2):
+    return DancingLinks(board).count(limit)
+
+
+# yields every solution of a 2D python list board using Dancing Links
+def dlx_solutions(board):
+    return DancingLinks(board).solutions()
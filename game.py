@@ -0,0 +1,434 @@
+import math
+from array import array
+from sudoku_generator import SudokuGenerator
+from sudoku_generator import DIFFICULTIES
+from techniques import GRADE_BANDS, HIDDEN_SINGLE, NAKED_SINGLE
+
+# kinds of unit a cell belongs to
+UNIT_ROW = 0
+UNIT_COL = 1
+UNIT_BOX = 2
+
+# Each move in the undo history is packed into one integer: bits 0-4 hold the new number, bits 5-9 the old number,
+# bits 10-21 the cell index, SKETCH_FLAG marks a change to the sketched value instead of the value, and CHAINED_FLAG
+# marks a change that belongs to the same move as the entry before it. Once the history grows past twice
+# HISTORY_LIMIT entries, the oldest whole moves are dropped until about HISTORY_LIMIT are left.
+SKETCH_FLAG = 1 << 22
+CHAINED_FLAG = 1 << 23
+HISTORY_LIMIT = 10000
+
+
+# Game state and rules of one puzzle, with no dependency on pygame, so batch tools and servers can run many sessions
+# headless. Board extends it with drawing; here redraw() does nothing.
+#
+# Cells are numbered row by row, so cell k is at (k // size, k % size). The whole state is kept in flat byte arrays
+# (values, sketches, given flags, solution, conflict flags and unit counts), which keeps a 9x9 game to about a
+# kilobyte and makes copying it a handful of buffer copies.
+#
+# The candidates of every empty cell are kept as bitmasks (bit v set if v can go there) and updated as numbers come
+# and go, so only the cells of a unit whose set of numbers changed are looked at again.
+class Game:
+    __slots__ = (
+        "difficulty",
+        "size",
+        "box_length",
+        "values",
+        "sketches",
+        "givens",
+        "solution_values",
+        "conflict_flags",
+        "selected",
+        "empty_count",
+        "row_counts",
+        "col_counts",
+        "box_counts",
+        "row_masks",
+        "col_masks",
+        "box_masks",
+        "candidates",
+        "duplicates",
+        "conflicts",
+        "history",
+        "future",
+    )
+
+    # If a PuzzlePool or PuzzleBank is given as pool, the puzzle is taken from it instead of being generated here.
+    # size is the row length of the board and can be any square number, such as 4, 9, 16 or 25. A seed makes the
+    # generated puzzle reproducible.
+    def __init__(self, difficulty, pool=None, size=9, seed=None):
+        self.difficulty = difficulty
+        self.size = size
+        self.box_length = int(math.sqrt(size))
+
+        # Determined how many cells will be removed based on the difficulty selected, scaled from 9x9 to the board
+        # size.
+        removed_cell = DIFFICULTIES.get(self.difficulty, DIFFICULTIES["Hard"]) * size * size // 81
+
+        # Builds the puzzle and its solution. A 9x9 puzzle is picked by the grade band of its difficulty, which also
+        # keeps it to a single solution, so the stored solution is the only correct fill. Grading only covers 9x9, and
+        # proving uniqueness takes seconds from 16x16 up, so larger boards go by removed cells alone and skip the check.
+        if pool is not None and size == 9:
+            board, solution = pool.take(self.difficulty)
+        elif size == 9:
+            # imported here so that importing game does not load the grader and its batch tooling
+            from grader import generate_graded
+
+            board, solution, _ = generate_graded(self.difficulty if self.difficulty in GRADE_BANDS else "Hard", seed)
+        else:
+            sudoku = SudokuGenerator(size, removed_cell, unique=size <= 9, seed=seed)
+            sudoku.fill_values()
+            solution = [row[:] for row in sudoku.get_board()]
+            sudoku.remove_cells()
+            board = sudoku.get_board()
+
+        self.values = bytearray(num for row in board for num in row)
+        self.sketches = bytearray(size * size)
+        self.givens = bytes(1 if num else 0 for num in self.values)
+        self.solution_values = bytes(num for row in solution for num in row)
+        self.conflict_flags = bytearray(size * size)
+        self.selected = None
+
+        # packed changes that can be undone, and undone changes that can be redone
+        self.history = array("I")
+        self.future = array("I")
+
+        # Running counts that answer is_full, check_board and conflict queries without scanning the board: the number
+        # of empty cells, how often each number appears in each row, column and box (unit u, number v at
+        # u * (size + 1) + v), the number of (unit, number) pairs that appear more than once, and the set of cells
+        # involved in such a repeat.
+        self.empty_count = 0
+        self.row_counts = bytearray(size * (size + 1))
+        self.col_counts = bytearray(size * (size + 1))
+        self.box_counts = bytearray(size * (size + 1))
+        self.duplicates = 0
+        self.conflicts = set()
+
+        # the numbers present in each row, column and box as bitmasks, and the candidates of each cell, 0 when filled
+        self.row_masks = array("I", bytes(4 * size))
+        self.col_masks = array("I", bytes(4 * size))
+        self.box_masks = array("I", bytes(4 * size))
+        self.candidates = None
+        for k in range(size * size):
+            if self.values[k]:
+                self.count_value(k, self.values[k], 1)
+            else:
+                self.empty_count += 1
+        self.candidates = array("I", bytes(4 * size * size))
+        for k in range(size * size):
+            self.update_candidates(k)
+
+    # Returns a copy of the game that can be played independently of this one. The givens and solution never change,
+    # so they are shared. The copy is always a plain Game: a subclass that draws, such as Board, keeps display state
+    # outside the slots that two boards cannot share, so only the game state is copied.
+    def copy(self):
+        other = object.__new__(Game)
+        for name in Game.__slots__:
+            setattr(other, name, getattr(self, name))
+        for name in ("values", "sketches", "conflict_flags", "row_counts", "col_counts", "box_counts"):
+            setattr(other, name, bytearray(getattr(self, name)))
+        for name in ("row_masks", "col_masks", "box_masks", "candidates"):
+            setattr(other, name, array("I", getattr(self, name)))
+        other.history = array("I", self.history)
+        other.future = array("I", self.future)
+        other.conflicts = set(self.conflicts)
+        return other
+
+    # returns the values and sketches of the board as a single bytes object
+    def snapshot(self):
+        return bytes(self.values) + bytes(self.sketches)
+
+    # Restores the values and sketches saved by snapshot(), rebuilding the counts through set_value so conflicts and
+    # the display stay in step. The undo history no longer matches the board, so it is cleared.
+    def restore(self, snapshot):
+        del self.history[:]
+        del self.future[:]
+        cells = self.size * self.size
+        for k in range(cells):
+            if self.values[k] != snapshot[k] or self.sketches[k] != snapshot[cells + k]:
+                self.set_value(k, snapshot[k])
+                self.sketches[k] = snapshot[cells + k]
+                self.redraw(k)
+
+    # returns the board as a 2D python list of numbers
+    @property
+    def board(self):
+        return [list(self.values[row * self.size : (row + 1) * self.size]) for row in range(self.size)]
+
+    # returns the solution as a 2D python list of numbers
+    @property
+    def solution(self):
+        return [list(self.solution_values[row * self.size : (row + 1) * self.size]) for row in range(self.size)]
+
+    # returns the board as it was when the game started, as a 2D python list of numbers
+    @property
+    def original_board(self):
+        return [
+            [self.values[k] if self.givens[k] else 0 for k in range(row * self.size, (row + 1) * self.size)]
+            for row in range(self.size)
+        ]
+
+    # called whenever the state of cell k changes, so a display can repaint it
+    def redraw(self, k):
+        pass
+
+    # called whenever the candidates of cell k change, so a display showing them can repaint it
+    def candidates_changed(self, k):
+        pass
+
+    # Returns the index of the cell at (row, col).
+    def index(self, row, col):
+        return row * self.size + col
+
+    def select(self, row, col):
+        # Makes sure any previously selected cell will be unselected when a new cell is selected.
+        old = self.selected
+
+        # Marks the cell at (row, col) in the board as the current selected cell. This cell is denoted in red.
+        self.selected = self.index(row, col)
+        if old is not None:
+            self.redraw(old)
+        self.redraw(self.selected)
+
+    def clear(self):
+        # Clears the cell value of the cell that is currently being selected. Note: The user can only clear the value
+        # and sketch value of a cell if they are filled by themselves and is not a cell that has been randomly
+        # generated (value was already given at the beginning).
+        k = self.selected
+        if k is not None and not self.givens[k]:
+            self.change(k, False, 0)
+
+    # Sets the sketched value of the current selected cell equal to user entered value. It will be displayed in the
+    # top-left corner of the cell using the draw() function.
+    def sketch(self, value):
+        k = self.selected
+        if k is not None and not self.givens[k] and not self.values[k]:
+            self.change(k, True, value)
+
+    # Sets the value of the current selected cell equal to user entered value. Called when the user presses the Enter
+    # key. This will only be done if the selected cell was originally blank or equal to 0.
+    def place_number(self, value=None):
+        k = self.selected
+        if k is not None and not self.givens[k]:
+            chained = self.change(k, False, value or self.sketches[k])
+            self.change(k, True, 0, chained)
+
+    # Sets the value of cell k, or its sketched value if sketch is True, and records the change in the undo history.
+    # chained puts the change in the same move as the last one recorded. Returns True if this or an earlier part of
+    # the move was recorded, so it can be passed as chained to the next change of the same move.
+    def change(self, k, sketch, new, chained=False):
+        old = self.sketches[k] if sketch else self.values[k]
+        if old == new:
+            return chained
+        self.history.append(
+            new | old << 5 | k << 10 | (SKETCH_FLAG if sketch else 0) | (CHAINED_FLAG if chained else 0)
+        )
+        if len(self.history) > 2 * HISTORY_LIMIT:
+            # trims whole moves only, up to the first entry from HISTORY_LIMIT on that starts one
+            cut = HISTORY_LIMIT
+            while cut < len(self.history) - 1 and self.history[cut] & CHAINED_FLAG:
+                cut += 1
+            del self.history[:cut]
+        del self.future[:]
+        self.apply(k, sketch, new)
+        return True
+
+    # sets the value or sketched value of cell k without recording it
+    def apply(self, k, sketch, value):
+        if sketch:
+            self.sketches[k] = value
+        else:
+            self.set_value(k, value)
+        self.redraw(k)
+
+    # Takes back the last move. Returns False if there is nothing to undo.
+    def undo(self):
+        if not self.history:
+            return False
+        while self.history:
+            delta = self.history.pop()
+            self.future.append(delta)
+            self.apply(delta >> 10 & 0xFFF, delta & SKETCH_FLAG, delta >> 5 & 31)
+            if not delta & CHAINED_FLAG:
+                break
+        return True
+
+    # Makes the last undone move again. Returns False if there is nothing to redo.
+    def redo(self):
+        if not self.future:
+            return False
+        while True:
+            delta = self.future.pop()
+            self.history.append(delta)
+            self.apply(delta >> 10 & 0xFFF, delta & SKETCH_FLAG, delta & 31)
+            if not self.future or not self.future[-1] & CHAINED_FLAG:
+                break
+        return True
+
+    # Sets the value of cell k and updates the running counts, redrawing any other cell whose conflict state changes.
+    def set_value(self, k, value):
+        old = self.values[k]
+        if old == value:
+            return
+        self.values[k] = value
+        if old:
+            self.count_value(k, old, -1)
+        else:
+            self.empty_count -= 1
+        if value:
+            self.count_value(k, value, 1)
+        else:
+            self.empty_count += 1
+            self.set_conflict(k, False)
+        if self.candidates is not None:
+            self.update_candidates(k)
+
+    # Adds change (1 or -1) to the counts of value in the row, column and box of cell k. When value appears in or
+    # disappears from a unit, the candidates of that unit's cells are updated. When value starts or stops repeating in
+    # a unit, the cells of that unit holding value are rechecked.
+    def count_value(self, k, value, change):
+        row, col = divmod(k, self.size)
+        box = (row // self.box_length) * self.box_length + col // self.box_length
+        stride = self.size + 1
+        for counts, masks, unit, index in (
+            (self.row_counts, self.row_masks, UNIT_ROW, row),
+            (self.col_counts, self.col_masks, UNIT_COL, col),
+            (self.box_counts, self.box_masks, UNIT_BOX, box),
+        ):
+            position = index * stride + value
+            counts[position] += change
+            if counts[position] == (1 if change > 0 else 0):
+                bit = 1 << value
+                masks[index] ^= bit
+                if self.candidates is None:
+                    continue
+                for j in self.unit_cells(k, unit):
+                    # a number new to the unit is struck from its cells, while one that left may come back only
+                    # where the cell's other units allow it
+                    if change > 0:
+                        if self.candidates[j] & bit:
+                            self.candidates[j] ^= bit
+                            self.candidates_changed(j)
+                    elif not self.values[j]:
+                        self.update_candidates(j)
+                continue
+            if change > 0 and counts[position] == 2:
+                self.duplicates += 1
+            elif change < 0 and counts[position] == 1:
+                self.duplicates -= 1
+            else:
+                continue
+            for j in self.unit_cells(k, unit):
+                if self.values[j] == value:
+                    self.set_conflict(j, self.is_conflicting(*divmod(j, self.size)))
+        if self.values[k]:
+            self.set_conflict(k, self.is_conflicting(row, col))
+
+    # returns the indexes of the cells in the row, column or box containing cell k
+    def unit_cells(self, k, unit):
+        row, col = divmod(k, self.size)
+        if unit == UNIT_ROW:
+            return range(row * self.size, (row + 1) * self.size)
+        if unit == UNIT_COL:
+            return range(col, self.size * self.size, self.size)
+        row_start = row - row % self.box_length
+        col_start = col - col % self.box_length
+        return [
+            self.index(row_start + r, col_start + c) for r in range(self.box_length) for c in range(self.box_length)
+        ]
+
+    # recomputes the candidates of cell k from the masks of its row, column and box
+    def update_candidates(self, k):
+        if self.values[k]:
+            mask = 0
+        else:
+            row, col = divmod(k, self.size)
+            box = (row // self.box_length) * self.box_length + col // self.box_length
+            mask = ((1 << self.size) - 1) << 1 & ~(self.row_masks[row] | self.col_masks[col] | self.box_masks[box])
+        if self.candidates[k] != mask:
+            self.candidates[k] = mask
+            self.candidates_changed(k)
+
+    # Returns the next number that can be placed by logic alone, as a (row, col, value, technique) tuple where
+    # technique is techniques.NAKED_SINGLE for a cell with one candidate or techniques.HIDDEN_SINGLE for a number that
+    # fits in only one cell of a row, column or box. Returns None if there is no single, or the board has a conflict to
+    # fix first.
+    def hint(self):
+        if self.duplicates:
+            return None
+        size = self.size
+        for k, mask in enumerate(self.candidates):
+            if mask and not mask & (mask - 1):
+                return k // size, k % size, mask.bit_length() - 1, NAKED_SINGLE
+
+        starts = range(0, size, self.box_length)
+        for unit, first_cells in (
+            (UNIT_ROW, range(0, size * size, size)),
+            (UNIT_COL, range(size)),
+            (UNIT_BOX, [self.index(row, col) for row in starts for col in starts]),
+        ):
+            for first in first_cells:
+                cells = self.unit_cells(first, unit)
+                once = 0
+                more = 0
+                for j in cells:
+                    mask = self.candidates[j]
+                    more |= once & mask
+                    once |= mask
+                once &= ~more
+                if once:
+                    bit = once & -once
+                    for j in cells:
+                        if self.candidates[j] & bit:
+                            return j // size, j % size, bit.bit_length() - 1, HIDDEN_SINGLE
+        return None
+
+    # marks whether cell k is part of a conflict, redrawing it if that changed
+    def set_conflict(self, k, conflict):
+        if self.conflict_flags[k] != conflict:
+            self.conflict_flags[k] = conflict
+            if conflict:
+                self.conflicts.add(k)
+            else:
+                self.conflicts.discard(k)
+            self.redraw(k)
+
+    # Returns True if the number at (row, col) also appears elsewhere in its row, column or box.
+    def is_conflicting(self, row, col):
+        value = self.values[row * self.size + col]
+        if not value:
+            return False
+        box = (row // self.box_length) * self.box_length + col // self.box_length
+        stride = self.size + 1
+        return (
+            self.row_counts[row * stride + value] > 1
+            or self.col_counts[col * stride + value] > 1
+            or self.box_counts[box * stride + value] > 1
+        )
+
+    # Resets all cells in the board to their original values.
+    # The reset is recorded as a single move, so it can be undone.
+    def reset_to_original(self):
+        selected = self.selected
+        self.selected = None
+        chained = False
+        for k in range(self.size * self.size):
+            if not self.givens[k]:
+                chained = self.change(k, False, 0, chained)
+                chained = self.change(k, True, 0, chained)
+        if selected is not None:
+            self.redraw(selected)
+
+    # Returns a Boolean value indicating whether the board is full or not.
+    def is_full(self):
+        return self.empty_count == 0
+
+    # Finds an empty cell and returns its row and col as a tuple (x, y).
+    def find_empty(self):
+        if self.empty_count == 0:
+            return None
+        return divmod(self.values.index(0), self.size)
+
+    # Check whether the Sudoku board is solved correctly. A full board with no number repeated in any row, column or
+    # box is a solution, so this only needs the running counts.
+    def check_board(self):
+        return self.is_full() and self.duplicates == 0
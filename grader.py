@@ -0,0 +1,238 @@
+import argparse
+import os
+import random
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from candidates import Candidates
+from puzzle_bank import HEADER_SIZE, RECORD_SIZE, GRID_SIZE, PuzzleBank
+from sudoku_generator import DIFFICULTIES, SudokuGenerator
+from techniques import BOX_LINE, GUESSING, HIDDEN_PAIR, HIDDEN_SINGLE, NAKED_PAIR, NAKED_SINGLE, POINTING, TECHNIQUES
+from techniques import GRADE_BANDS
+
+# generate_graded gives up after this many boards
+MAX_TRIES = 100
+
+Grade = namedtuple("Grade", ["level", "steps", "solved"])
+
+# the 27 rows, columns and boxes of a 9x9 board as lists of flat cell indexes, and the 20 peers of each cell
+ROWS = [[row * 9 + col for col in range(9)] for row in range(9)]
+COLS = [[row * 9 + col for row in range(9)] for col in range(9)]
+BOXES = [[(box // 3 * 3 + i // 3) * 9 + box % 3 * 3 + i % 3 for i in range(9)] for box in range(9)]
+UNITS = ROWS + COLS + BOXES
+PEERS = [sorted({peer for unit in UNITS if cell in unit for peer in unit} - {cell}) for cell in range(81)]
+BOX_OF = [row // 3 * 3 + col // 3 for row in range(9) for col in range(9)]
+
+
+# Solves a 9x9 board by logical deduction only, always going back to the easiest technique after any progress. Each
+# technique returns how many deductions it made. Returns a Grade with the hardest technique level used, the total
+# number of deductions, and whether the board was finished. A contradiction leaves a cell with no candidates, so the
+# board can never be finished and is graded as GUESSING.
+def grade(board):
+    candidates = Candidates(9)
+    values = [num for row in board for num in row]
+    for cell, num in enumerate(values):
+        if num:
+            if not candidates.is_valid(cell // 9, cell % 9, num):
+                return Grade(GUESSING, 0, False)
+            candidates.place(cell // 9, cell % 9, num)
+    masks = [0 if values[cell] else candidates.get(cell // 9, cell % 9) for cell in range(81)]
+
+    level = 0
+    steps = 0
+    while 0 in values:
+        for technique, step in STEPS:
+            found = step(values, masks)
+            if found:
+                level = max(level, technique)
+                steps += found
+                break
+        else:
+            return Grade(GUESSING, steps, False)
+    return Grade(level, steps, True)
+
+
+# enters num at cell and removes it from the candidates of the cell's peers
+def place(values, masks, cell, num):
+    values[cell] = num
+    masks[cell] = 0
+    bit = ~(1 << num)
+    for peer in PEERS[cell]:
+        masks[peer] &= bit
+
+
+# removes the digits in mask from every cell of unit that is not in keep. Returns True if anything was removed.
+def eliminate(masks, unit, mask, keep):
+    changed = False
+    for cell in unit:
+        if cell not in keep and masks[cell] & mask:
+            masks[cell] &= ~mask
+            changed = True
+    return changed
+
+
+# places every cell that has a single candidate left
+def naked_single(values, masks):
+    found = 0
+    for cell in range(81):
+        mask = masks[cell]
+        if mask and not mask & (mask - 1):
+            place(values, masks, cell, mask.bit_length() - 1)
+            found += 1
+    return found
+
+
+# places every digit that fits in only one cell of a unit
+def hidden_single(values, masks):
+    found = 0
+    for unit in UNITS:
+        once = 0
+        more = 0
+        for cell in unit:
+            more |= once & masks[cell]
+            once |= masks[cell]
+        once &= ~more
+        while once:
+            bit = once & -once
+            once ^= bit
+            for cell in unit:
+                if masks[cell] & bit:
+                    place(values, masks, cell, bit.bit_length() - 1)
+                    found += 1
+                    break
+    return found
+
+
+# two cells of a unit with the same two candidates remove those digits from the rest of the unit
+def naked_pair(values, masks):
+    for unit in UNITS:
+        seen = {}
+        for cell in unit:
+            mask = masks[cell]
+            if mask.bit_count() == 2:
+                if mask in seen and eliminate(masks, unit, mask, (cell, seen[mask])):
+                    return True
+                seen[mask] = cell
+    return False
+
+
+# two digits confined to the same two cells of a unit remove every other candidate from those cells
+def hidden_pair(values, masks):
+    for unit in UNITS:
+        places = {}
+        for num in range(1, 10):
+            cells = tuple(cell for cell in unit if masks[cell] >> num & 1)
+            if len(cells) == 2:
+                if cells in places:
+                    pair = (1 << num) | (1 << places[cells])
+                    if any(masks[cell] & ~pair for cell in cells):
+                        for cell in cells:
+                            masks[cell] &= pair
+                        return True
+                places[cells] = num
+    return False
+
+
+# a digit confined to one row or column of a box is removed from the rest of that row or column
+def pointing(values, masks):
+    for box in BOXES:
+        for num in range(1, 10):
+            cells = [cell for cell in box if masks[cell] >> num & 1]
+            if len(cells) < 2:
+                continue
+            rows = {cell // 9 for cell in cells}
+            cols = {cell % 9 for cell in cells}
+            if len(rows) == 1 and eliminate(masks, ROWS[rows.pop()], 1 << num, cells):
+                return True
+            if len(cols) == 1 and eliminate(masks, COLS[cols.pop()], 1 << num, cells):
+                return True
+    return False
+
+
+# a digit confined to one box within a row or column is removed from the rest of that box
+def box_line(values, masks):
+    for line in ROWS + COLS:
+        for num in range(1, 10):
+            cells = [cell for cell in line if masks[cell] >> num & 1]
+            if len(cells) < 2:
+                continue
+            boxes = {BOX_OF[cell] for cell in cells}
+            if len(boxes) == 1 and eliminate(masks, BOXES[boxes.pop()], 1 << num, cells):
+                return True
+    return False
+
+
+STEPS = [
+    (NAKED_SINGLE, naked_single),
+    (HIDDEN_SINGLE, hidden_single),
+    (NAKED_PAIR, naked_pair),
+    (HIDDEN_PAIR, hidden_pair),
+    (POINTING, pointing),
+    (BOX_LINE, box_line),
+]
+
+
+# returns the name of a grade level
+def level_name(level):
+    if level == GUESSING:
+        return "Guessing"
+    return TECHNIQUES[level - 1] if level else "Solved"
+
+
+# Generates a unique 9x9 puzzle that grades within the band GRADE_BANDS gives difficulty. Cells are removed down to the
+# difficulty's count first, then further while the puzzle grades too easy. A board that grades too hard from the start
+# is thrown away and another built from a seed drawn from seed, so the same seed always gives the same puzzle when no
+# time budget is set. max_nodes and max_seconds cap each search, as in SudokuGenerator. Returns (puzzle, solution,
+# level).
+def generate_graded(difficulty, seed=None, max_nodes=None, max_seconds=None):
+    low, high = GRADE_BANDS[difficulty]
+    seeds = random.Random(seed)
+    for _ in range(MAX_TRIES):
+        sudoku = SudokuGenerator(9, DIFFICULTIES[difficulty], True, seeds.getrandbits(64), max_nodes, max_seconds)
+        sudoku.fill_values()
+        solution = [row[:] for row in sudoku.get_board()]
+        level = sudoku.remove_cells_graded(lambda board: grade(board).level, low, high)
+        if level is not None:
+            return sudoku.get_board(), solution, level
+    raise RuntimeError("no %s puzzle graded within %d boards" % (difficulty, MAX_TRIES))
+
+
+# worker task that grades records start to stop of a bank and returns their levels
+def grade_range(bank_path, start, stop):
+    with PuzzleBank(bank_path) as bank:
+        return start, [grade(bank[k].puzzle).level for k in range(start, stop)]
+
+
+# Grades every puzzle of a bank across a pool of worker processes and stores each level in the record's grade byte.
+# Returns a Counter of how many puzzles needed each level.
+def grade_bank(bank_path, workers=None, chunk_size=5000):
+    with PuzzleBank(bank_path) as bank:
+        count = len(bank)
+    levels = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(bank_path, "r+b") as file:
+        futures = [
+            executor.submit(grade_range, bank_path, start, min(start + chunk_size, count))
+            for start in range(0, count, chunk_size)
+        ]
+        for future in futures:
+            start, grades = future.result()
+            for k, level in enumerate(grades, start):
+                file.seek(HEADER_SIZE + k * RECORD_SIZE + 2 * GRID_SIZE + 1)
+                file.write(bytes((level,)))
+            levels.update(grades)
+    return levels
+
+
+# Command line entry point that grades a bank in place and prints how many puzzles needed each technique
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade every puzzle of a Sudoku puzzle bank.")
+    parser.add_argument("bank")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args(argv)
+
+    levels = grade_bank(args.bank, args.workers)
+    for level in sorted(levels):
+        print("%-20s %d" % (level_name(level), levels[level]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import random
+import time
+from puzzle_server import HOST, PORT, raise_file_limit
+from sudoku_generator import DIFFICULTIES
+
+
+# sends one request line and returns the reply line and how long it took in seconds
+async def request(reader, writer, line):
+    start = time.perf_counter()
+    writer.write(line.encode() + b"\n")
+    await writer.drain()
+    reply = (await reader.readline()).decode().strip()
+    return reply, time.perf_counter() - start
+
+
+# Runs one client: asks for a new puzzle, then makes moves and checks the board against it, until requests requests
+# have been sent. Every reply is checked to start with OK, and each latency is appended to latencies.
+async def client(host, port, requests, rng, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        sent = 0
+        while sent < requests:
+            reply, elapsed = await request(reader, writer, "NEW %s" % rng.choice(list(DIFFICULTIES)))
+            latencies.append(elapsed)
+            sent += 1
+            _, puzzle_id, puzzle = reply.split()
+            for _ in range(min(8, requests - sent)):
+                line = "MOVE %s %d %d %d" % (puzzle_id, rng.randrange(9), rng.randrange(9), rng.randint(1, 9))
+                if sent % 4 == 3:
+                    line = "CHECK %s %s" % (puzzle_id, puzzle)
+                reply, elapsed = await request(reader, writer, line)
+                if not reply.startswith("OK"):
+                    raise RuntimeError("%s got %s" % (line, reply))
+                latencies.append(elapsed)
+                sent += 1
+        writer.write(b"QUIT\n")
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+# returns the value below which fraction p of the sorted samples fall
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+# Opens clients connections at once, each sending requests requests, and prints the request rate and latency
+# percentiles.
+async def run(host, port, clients, requests, seed):
+    rng = random.Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(host, port, requests, random.Random(rng.getrandbits(64)), latencies) for _ in range(clients))
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(
+        "%d clients, %d requests in %.2f s: %.0f requests/s"
+        % (clients, len(latencies), elapsed, len(latencies) / elapsed)
+    )
+    for name, p in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)):
+        print("%-4s %8.2f ms" % (name, percentile(latencies, p) * 1000))
+
+
+# Command line entry point for load testing a running puzzle_server
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a running Sudoku puzzle server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("-p", "--port", type=int, default=PORT)
+    parser.add_argument("-c", "--clients", type=int, default=1000, help="concurrent connections")
+    parser.add_argument("-n", "--requests", type=int, default=20, help="requests per connection")
+    parser.add_argument("-s", "--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    raise_file_limit()
+    asyncio.run(run(args.host, args.port, args.clients, args.requests, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import itertools
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from grader import grade, level_name
+from solver import Solver
+from sudoku_generator import board_to_string, string_to_board
+
+# The commands a pipeline can run on each puzzle
+COMMANDS = ("solve", "validate", "grade")
+
+
+# Yields the puzzle of each non-blank line of file, read one line at a time. Only the first comma separated field is
+# used, so files written by batch.py can be read as well as bare 81 character puzzles.
+def read_puzzles(file):
+    for line in file:
+        text = line.split(",", 1)[0].strip()
+        if text:
+            yield text
+
+
+# yields lists of up to size items from items, taking only one list at a time from it
+def chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Runs command on one puzzle given as text and returns the output line for it, without the newline:
+#   solve     puzzle,solution or puzzle,unsolvable
+#   validate  puzzle,valid, or conflict, unsolvable or multiple for puzzles without a single solution
+#   grade     puzzle,level,technique name
+# A line that is not a puzzle gives puzzle,error: and the reason.
+def run(command, text):
+    try:
+        board = string_to_board(text)
+    except ValueError as error:
+        return "%s,error: %s" % (text, error)
+    if command == "grade":
+        level = grade(board).level
+        return "%s,%d,%s" % (text, level, level_name(level))
+
+    solver = Solver(board)
+    if command == "solve":
+        solution = solver.solve()
+        return "%s,%s" % (text, board_to_string(solution) if solution else "unsolvable")
+    if not solver.consistent:
+        return "%s,conflict" % text
+    return "%s,%s" % (text, ("unsolvable", "valid", "multiple")[solver.count(2)])
+
+
+# worker task that runs command on a chunk of puzzles and returns their output lines
+def run_chunk(command, texts):
+    return [run(command, text) for text in texts]
+
+
+# Yields the output line of every puzzle in texts, in input order. With a worker pool, at most twice as many chunks as
+# there are workers are in flight at once, so memory stays constant however long the input is.
+def process(command, texts, workers=0, chunk_size=200):
+    if not workers:
+        for text in texts:
+            yield run(command, text)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks(texts, chunk_size):
+            pending.append(executor.submit(run_chunk, command, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+# Command line entry point. Reads puzzles from a file or stdin and writes one output line per puzzle to stdout or a
+# file as soon as it is ready.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve, validate or grade a stream of Sudoku puzzles.")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("input", nargs="?", default="-", help="file of puzzles, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="worker processes, or 0 to work in this one")
+    parser.add_argument("-c", "--chunk-size", type=int, default=200, help="puzzles per worker task")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        lines = process(args.command, read_puzzles(source), args.workers, args.chunk_size)
+        for count, line in enumerate(lines, 1):
+            out.write(line + "\n")
+            if count % args.chunk_size == 0:
+                out.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
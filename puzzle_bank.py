@@ -0,0 +1,200 @@
+import argparse
+import itertools
+import mmap
+import os
+import random
+import struct
+from collections import namedtuple
+from solver import solve
+from sudoku_generator import DIFFICULTIES, board_to_string, string_to_board
+
+# File layout: a 16 byte header followed by fixed-width records, so record k starts at HEADER_SIZE + k * RECORD_SIZE.
+# The header holds the magic bytes, the format version, the record size and 4 reserved bytes that are always 0. The
+# number of records is worked out from the file size, so appending never has to go back and update the header.
+# Each record holds the givens and the solution as 81 packed nibbles (41 bytes each), then a difficulty code, a grade
+# byte and the 64-bit seed the puzzle was generated from.
+MAGIC = b"SUDOKUBK"
+VERSION = 1
+HEADER = struct.Struct("<8sHHI")
+HEADER_SIZE = HEADER.size
+GRID_SIZE = 41
+META = struct.Struct("<BBQ")
+RECORD_SIZE = 2 * GRID_SIZE + META.size
+
+# difficulty names are stored as their 1-based position in DIFFICULTIES, with 0 meaning unknown
+DIFFICULTY_NAMES = [None] + list(DIFFICULTIES)
+DIFFICULTY_CODES = {name: code for code, name in enumerate(DIFFICULTY_NAMES) if name}
+
+BankRecord = namedtuple("BankRecord", ["puzzle", "solution", "difficulty", "grade", "seed"])
+
+
+# packs a 9x9 board into 41 bytes, two cells per byte
+def pack_grid(board):
+    cells = [num for row in board for num in row] + [0]
+    return bytes((cells[i] << 4) | cells[i + 1] for i in range(0, 82, 2))
+
+
+# unpacks 41 bytes back into a 9x9 board
+def unpack_grid(data):
+    cells = []
+    for byte in data:
+        cells.append(byte >> 4)
+        cells.append(byte & 15)
+    return [cells[row * 9 : row * 9 + 9] for row in range(9)]
+
+
+# Appends records to a bank file. Opening an existing file keeps its records and adds to the end.
+class BankWriter:
+
+    # class constructor that opens path for appending, writing the header if the file is new
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # writes one puzzle with its solution and metadata
+    def append(self, puzzle, solution, difficulty=None, grade=0, seed=0):
+        self.file.write(
+            pack_grid(puzzle) + pack_grid(solution) + META.pack(DIFFICULTY_CODES.get(difficulty, 0), grade, seed)
+        )
+
+    def close(self):
+        self.file.close()
+
+
+# Read-only view of a bank file. The file is memory-mapped, so fetching record k reads only that record and memory use
+# does not grow with the size of the bank.
+class PuzzleBank:
+
+    # class constructor that maps path and checks its header
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size < HEADER_SIZE:
+            self.file.close()
+            raise ValueError("%s is not a puzzle bank" % path)
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, _ = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError("%s is not a puzzle bank" % path)
+        self.count = (len(self.map) - HEADER_SIZE) // RECORD_SIZE
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    # returns record k as a BankRecord
+    def __getitem__(self, k):
+        if k < 0:
+            k += self.count
+        if not 0 <= k < self.count:
+            raise IndexError("record %d out of range" % k)
+        start = HEADER_SIZE + k * RECORD_SIZE
+        data = self.map[start : start + RECORD_SIZE]
+        difficulty, grade, seed = META.unpack_from(data, 2 * GRID_SIZE)
+        return BankRecord(
+            unpack_grid(data[:GRID_SIZE]),
+            unpack_grid(data[GRID_SIZE : 2 * GRID_SIZE]),
+            DIFFICULTY_NAMES[difficulty] if difficulty < len(DIFFICULTY_NAMES) else None,
+            grade,
+            seed,
+        )
+
+    def __iter__(self):
+        for k in range(self.count):
+            yield self[k]
+
+    # returns the difficulty code of record k without unpacking its grids
+    def difficulty_code(self, k):
+        return self.map[HEADER_SIZE + k * RECORD_SIZE + 2 * GRID_SIZE]
+
+    # Returns a random (puzzle, solution) pair of the given difficulty, so a bank can stand in for a PuzzlePool when
+    # creating a Board. Random records are tried first, then the bank is scanned lazily from a random start, so a
+    # lookup that hits early touches only a few records.
+    def take(self, difficulty):
+        code = DIFFICULTY_CODES[difficulty]
+        if not self.count:
+            raise LookupError("the puzzle bank is empty")
+        start = random.randrange(self.count)
+        probes = (random.randrange(self.count) for _ in range(32))
+        for k in itertools.chain(probes, range(start, self.count), range(start)):
+            if self.difficulty_code(k) == code:
+                record = self[k]
+                return record.puzzle, record.solution
+        raise LookupError("no %s puzzles in the bank" % difficulty)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+# Reads puzzles from a text file into a bank, one line at a time. Lines are either
+# "puzzle,solution,difficulty,grade,seed" as written by batch.py, or a bare 81 character puzzle whose solution is then
+# found with the solver. Missing trailing fields are allowed. Returns the number of puzzles imported.
+def import_text(text_path, bank_path):
+    count = 0
+    with open(text_path) as text, BankWriter(bank_path) as writer:
+        for line in text:
+            fields = line.strip().split(",")
+            if not fields[0]:
+                continue
+            puzzle = string_to_board(fields[0])
+            solution = string_to_board(fields[1]) if len(fields) > 1 and fields[1] else solve(puzzle)
+            if solution is None:
+                raise ValueError("puzzle %s has no solution" % fields[0])
+            difficulty = fields[2] if len(fields) > 2 and fields[2] else None
+            level = int(fields[3]) if len(fields) > 3 and fields[3] else 0
+            seed = int(fields[4]) if len(fields) > 4 and fields[4] else 0
+            writer.append(puzzle, solution, difficulty, level, seed)
+            count += 1
+    return count
+
+
+# writes every record of a bank as a "puzzle,solution,difficulty,grade,seed" line. Returns the number of puzzles
+# exported.
+def export_text(bank_path, text_path):
+    count = 0
+    with PuzzleBank(bank_path) as bank, open(text_path, "w") as text:
+        for record in bank:
+            text.write(
+                "%s,%s,%s,%d,%d\n"
+                % (
+                    board_to_string(record.puzzle),
+                    board_to_string(record.solution),
+                    record.difficulty or "",
+                    record.grade,
+                    record.seed,
+                )
+            )
+            count += 1
+    return count
+
+
+# Command line entry point for converting between text files and banks
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Sudoku puzzle banks to and from text.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        count = import_text(args.source, args.destination)
+    else:
+        count = export_text(args.source, args.destination)
+    print("%d puzzles" % count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import threading
+from collections import deque
+from grader import generate_graded
+from sudoku_generator import DIFFICULTIES, board_to_string, generate_sudoku_with_solution, string_to_board
+
+
+# Keeps a queue of ready (puzzle, solution) pairs for each difficulty so a new game never waits on generation. A
+# background thread tops a queue back up to size once it drops to low_water puzzles. The pool can be saved to and
+# loaded from a text file so the first game after launch is instant as well. When graded is True, each difficulty is
+# filled with puzzles that grade within its band in techniques.GRADE_BANDS, which are always unique; otherwise only the
+# number of removed cells sets the difficulty.
+class PuzzlePool:
+
+    # class constructor that creates the queues, warm starting them from path if that file exists
+    def __init__(self, size=5, low_water=2, difficulties=tuple(DIFFICULTIES), path=None, unique=True, graded=True):
+        self.size = size
+        self.low_water = low_water
+        self.path = path
+        self.unique = unique
+        self.graded = graded
+        self.queues = {difficulty: deque() for difficulty in difficulties}
+        self.refilling = set(difficulties)
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+        if path and os.path.exists(path):
+            self.load(path)
+
+    # starts the background refill thread
+    def start(self):
+        if self.thread is None:
+            self.stopped = False
+            self.thread = threading.Thread(target=self.run, name="PuzzlePool", daemon=True)
+            self.thread.start()
+
+    # stops the background refill thread, waiting for the puzzle it is building to finish
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    # Returns a (puzzle, solution) pair for difficulty. This is a queue pop unless the queue is empty, in which case
+    # the puzzle is generated on the spot.
+    def take(self, difficulty):
+        with self.condition:
+            queue = self.queues[difficulty]
+            puzzle = queue.popleft() if queue else None
+            if len(queue) <= self.low_water:
+                self.refilling.add(difficulty)
+                self.condition.notify()
+        if puzzle is None:
+            puzzle = self.generate(difficulty)
+        return puzzle
+
+    # returns the number of ready puzzles for difficulty
+    def available(self, difficulty):
+        with self.condition:
+            return len(self.queues[difficulty])
+
+    # builds one (puzzle, solution) pair for difficulty
+    def generate(self, difficulty):
+        if self.graded:
+            puzzle, solution, _ = generate_graded(difficulty)
+            return puzzle, solution
+        return generate_sudoku_with_solution(9, DIFFICULTIES[difficulty], self.unique)
+
+    # body of the refill thread. Generation runs outside the lock so take() never waits on it.
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and not self.refilling:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                difficulty = min(self.refilling, key=lambda key: len(self.queues[key]))
+
+            puzzle = self.generate(difficulty)
+
+            with self.condition:
+                queue = self.queues[difficulty]
+                queue.append(puzzle)
+                if len(queue) >= self.size:
+                    self.refilling.discard(difficulty)
+
+    # Writes every ready puzzle to path, one "puzzle,solution,difficulty" line each. The lines go to a temporary file
+    # that then replaces path, so an exit cut short leaves the old file whole.
+    def save(self, path=None):
+        path = path or self.path
+        with self.condition:
+            lines = [
+                "%s,%s,%s\n" % (board_to_string(puzzle), board_to_string(solution), difficulty)
+                for difficulty, queue in self.queues.items()
+                for puzzle, solution in queue
+            ]
+        temp = path + ".tmp"
+        with open(temp, "w") as file:
+            file.writelines(lines)
+        os.replace(temp, path)
+
+    # Adds the puzzles stored in path to the queues, ignoring difficulties this pool does not serve. Lines that cannot
+    # be read, such as one cut short by a crash, are skipped. Returns the number of lines skipped.
+    def load(self, path=None):
+        path = path or self.path
+        skipped = 0
+        with open(path) as file:
+            for line in file:
+                fields = line.strip().split(",")
+                if len(fields) < 3:
+                    skipped += line.strip() != ""
+                    continue
+                if fields[2] not in self.queues:
+                    continue
+                try:
+                    puzzle = (string_to_board(fields[0]), string_to_board(fields[1]))
+                except ValueError:
+                    skipped += 1
+                    continue
+                with self.condition:
+                    self.queues[fields[2]].append(puzzle)
+        with self.condition:
+            for difficulty, queue in self.queues.items():
+                if len(queue) >= self.size:
+                    self.refilling.discard(difficulty)
+        return skipped
@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import functools
+import os
+import random
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from batch import generate_chunk
+from sudoku_generator import DIFFICULTIES, board_to_string
+from transforms import apply_transform, random_transform
+
+# Line protocol, one request and one reply per line:
+#   NEW <difficulty>               OK <id> <puzzle>
+#   MOVE <id> <row> <col> <value>  OK correct or OK wrong
+#   CHECK <id> <board>             OK solved or OK unsolved
+#   QUIT                           closes the connection
+# Boards are 81 character strings with 0 for empty cells, and rows and columns count from 0. A bad request gets
+# "ERR <reason>" and the connection stays open.
+HOST = "127.0.0.1"
+PORT = 8765
+
+
+# Serves puzzles from a ready queue per difficulty. Refill tasks keep every queue topped up by running
+# batch.generate_chunk in a process pool, so the event loop itself only moves finished puzzles around. When requests
+# outrun the pool and a queue is empty, a puzzle is derived from one of the last recent puzzles generated by a random
+# symmetry transform instead of waiting, which keeps tail latency low under bursts; a transform leaves the grade
+# unchanged. When graded is True, puzzles are picked by the grade band of their difficulty. The solution of every
+# puzzle handed out is kept under its id, up to max_puzzles of the most recently used ones, to answer MOVE and CHECK.
+class PuzzleServer:
+
+    # class constructor. queue_size puzzles are kept ready per difficulty, built chunk_size at a time.
+    def __init__(
+        self, workers=None, queue_size=200, chunk_size=20, max_puzzles=100000, seed=None, recent=50, graded=True
+    ):
+        self.workers = workers or os.cpu_count()
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.max_puzzles = max_puzzles
+        self.graded = graded
+        self.random = random.Random(seed)
+        self.executor = None
+        self.queues = {}
+        self.recent = {difficulty: deque(maxlen=recent) for difficulty in DIFFICULTIES}
+        self.tasks = []
+        self.solutions = OrderedDict()
+        self.next_id = 0
+
+    # starts the process pool and a refill task per worker for each difficulty
+    async def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        for difficulty in DIFFICULTIES:
+            self.queues[difficulty] = asyncio.Queue(self.queue_size)
+            for _ in range(self.workers):
+                self.tasks.append(asyncio.create_task(self.refill(difficulty)))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.executor.shutdown(cancel_futures=True)
+
+    # Builds chunks of puzzles for difficulty in the pool and queues them, waiting whenever the queue is full.
+    async def refill(self, difficulty):
+        loop = asyncio.get_running_loop()
+        queue = self.queues[difficulty]
+        task = functools.partial(generate_chunk, graded=self.graded)
+        while True:
+            _, puzzles, _ = await loop.run_in_executor(
+                self.executor, task, difficulty, self.chunk_size, self.random.getrandbits(64)
+            )
+            for puzzle, solution, _, _ in puzzles:
+                self.recent[difficulty].append((puzzle, solution))
+                await queue.put((puzzle, solution))
+
+    # Takes a ready puzzle of difficulty, or derives one if the queue is empty, and returns its id and text. Only
+    # before the first puzzle of difficulty has been generated does this wait.
+    async def new_puzzle(self, difficulty):
+        queue = self.queues[difficulty]
+        if queue.empty() and self.recent[difficulty]:
+            puzzle, solution = self.random.choice(self.recent[difficulty])
+            transform = random_transform(self.random)
+            puzzle, solution = apply_transform(puzzle, transform), apply_transform(solution, transform)
+        else:
+            puzzle, solution = await queue.get()
+        puzzle, solution = board_to_string(puzzle), board_to_string(solution)
+        self.next_id += 1
+        self.solutions[self.next_id] = (puzzle, solution)
+        if len(self.solutions) > self.max_puzzles:
+            self.solutions.popitem(last=False)
+        return self.next_id, puzzle
+
+    # Returns the (puzzle, solution) pair handed out under id, or raises LookupError. The puzzle becomes the most
+    # recently used, so puzzles still in play are the last to be dropped.
+    def lookup(self, puzzle_id):
+        try:
+            key = int(puzzle_id)
+            self.solutions.move_to_end(key)
+        except (KeyError, ValueError):
+            raise LookupError("unknown puzzle %s" % puzzle_id) from None
+        return self.solutions[key]
+
+    # Returns the reply line to one request line.
+    async def reply(self, line):
+        fields = line.split()
+        command = fields[0].upper() if fields else ""
+        if command == "NEW" and len(fields) == 2:
+            if fields[1] not in DIFFICULTIES:
+                return "ERR unknown difficulty %s" % fields[1]
+            puzzle_id, puzzle = await self.new_puzzle(fields[1])
+            return "OK %d %s" % (puzzle_id, puzzle)
+        if command == "MOVE" and len(fields) == 5:
+            puzzle, solution = self.lookup(fields[1])
+            try:
+                row, col, value = int(fields[2]), int(fields[3]), int(fields[4])
+            except ValueError:
+                return "ERR row, column and value must be numbers"
+            if not (0 <= row < 9 and 0 <= col < 9):
+                return "ERR cell out of range"
+            return "OK correct" if str(value) == solution[row * 9 + col] else "OK wrong"
+        if command == "CHECK" and len(fields) == 3:
+            puzzle, solution = self.lookup(fields[1])
+            if len(fields[2]) != 81:
+                return "ERR expected 81 digits"
+            return "OK solved" if fields[2] == solution else "OK unsolved"
+        return "ERR bad request"
+
+    # Answers the requests of one connection until it sends QUIT or closes.
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode(errors="replace").strip()
+                if line.upper() == "QUIT":
+                    break
+                try:
+                    response = await self.reply(line)
+                except LookupError as error:
+                    response = "ERR %s" % error
+                writer.write(response.encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # listens on host and port until cancelled
+    async def serve(self, host=HOST, port=PORT):
+        await self.start()
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+# Raises the open file limit as far as allowed, since every client connection holds a socket. Does nothing where the
+# resource module is missing, as on Windows.
+def raise_file_limit():
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+# Command line entry point that runs the server until interrupted
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Sudoku puzzles over a line protocol on localhost.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("-p", "--port", type=int, default=PORT)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="generator processes")
+    parser.add_argument("-q", "--queue-size", type=int, default=200, help="ready puzzles kept per difficulty")
+    parser.add_argument("--ungraded", action="store_true", help="set difficulty by removed cells only, not by grade")
+    args = parser.parse_args(argv)
+
+    raise_file_limit()
+    server = PuzzleServer(args.workers, args.queue_size, graded=not args.ungraded)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
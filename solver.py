@@ -0,0 +1,221 @@
+import time
+from candidates import Candidates
+
+# searches look at the clock once every this many nodes
+CLOCK_INTERVAL = 256
+
+
+# Counters for the work done by a search, added up over every search that shares them. nodes counts cells visited,
+# checks the candidate numbers tried at them, and backtracks the numbers taken back out. aborted is True when the last
+# search ran out of budget.
+class SearchStats:
+    __slots__ = ("nodes", "backtracks", "checks", "restarts", "elapsed", "aborted")
+
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.checks = 0
+        self.restarts = 0
+        self.elapsed = 0.0
+        self.aborted = False
+
+    # returns the counters as a dictionary, for logging
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "SearchStats(%s)" % ", ".join("%s=%r" % item for item in self.as_dict().items())
+
+
+# Bitmask backtracking solver for any n^2 x n^2 board. Each step first places every naked and hidden single, then
+# branches on the empty cell with the fewest candidates (minimum remaining values), so most puzzles need very few
+# guesses.
+#
+# max_nodes and max_seconds cap each search. A search that runs out of either stops early with stats.aborted set, so
+# its count is only a lower bound. Work is added to stats, which several solvers can share, and hook, if given, is
+# called with stats after every search.
+class Solver:
+
+    # class constructor that copies the 2D python list of numbers so the caller's board is left untouched
+    def __init__(self, board, max_nodes=None, max_seconds=None, stats=None, hook=None):
+        self.row_length = len(board)
+        self.board = [list(row) for row in board]
+        self.candidates = Candidates(self.row_length)
+        self.empty = []
+        box_length = self.candidates.box_length
+        self.units = (
+            [[(row, col) for col in range(self.row_length)] for row in range(self.row_length)]
+            + [[(row, col) for row in range(self.row_length)] for col in range(self.row_length)]
+            + [
+                [(box // box_length * box_length + i // box_length, box % box_length * box_length + i % box_length)
+                 for i in range(self.row_length)]
+                for box in range(self.row_length)
+            ]
+        )
+        self.consistent = True
+        self.found = 0
+        self.solution = None
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.stats = stats if stats is not None else SearchStats()
+        self.hook = hook
+
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                num = self.board[row][col]
+                if not num:
+                    self.empty.append((row, col))
+                elif self.candidates.is_valid(row, col, num):
+                    self.candidates.place(row, col, num)
+                else:
+                    self.consistent = False
+
+    # Returns the number of solutions of the board, stopping as soon as limit solutions have been found or the budget
+    # runs out.
+    def count(self, limit=2):
+        self.found = 0
+        self.solution = None
+        self.stats.aborted = False
+        if self.consistent:
+            start = time.perf_counter()
+            self.search(limit)
+            self.stats.elapsed += time.perf_counter() - start
+            if self.hook is not None:
+                self.hook(self.stats)
+        return self.found
+
+    # returns a solved copy of the board, or None if it has no solution
+    def solve(self):
+        self.count(1)
+        return self.solution
+
+    # places num at (row, col) in the board and the bitmasks
+    def place(self, row, col, num):
+        self.board[row][col] = num
+        self.candidates.place(row, col, num)
+
+    # empties every cell in trail, in reverse order
+    def undo(self, trail):
+        for row, col in reversed(trail):
+            self.candidates.remove(row, col, self.board[row][col])
+            self.board[row][col] = 0
+
+    # Places every cell that has a single candidate, and every digit that fits in only one cell of a row, column or
+    # box, until neither rule applies. Placed cells are added to trail. Returns False on a contradiction: a cell with
+    # no candidates, or a digit with nowhere left to go in some unit.
+    def propagate(self, trail):
+        while True:
+            forced = False
+            for row, col in self.empty:
+                if self.board[row][col]:
+                    continue
+                mask = self.candidates.get(row, col)
+                if not mask:
+                    return False
+                if not mask & (mask - 1):
+                    self.place(row, col, mask.bit_length() - 1)
+                    trail.append((row, col))
+                    forced = True
+            if forced:
+                continue
+
+            for unit in self.units:
+                once = 0
+                more = 0
+                placed = 0
+                for row, col in unit:
+                    if self.board[row][col]:
+                        placed |= 1 << self.board[row][col]
+                    else:
+                        mask = self.candidates.get(row, col)
+                        more |= once & mask
+                        once |= mask
+                if (once | placed) != self.candidates.full:
+                    return False
+                once &= ~more
+                while once:
+                    bit = once & -once
+                    once ^= bit
+                    for row, col in unit:
+                        if not self.board[row][col] and self.candidates.get(row, col) & bit:
+                            self.place(row, col, bit.bit_length() - 1)
+                            trail.append((row, col))
+                            forced = True
+                            break
+            if not forced:
+                return True
+
+    # Searches for solutions until limit of them have been found. The search keeps its own stack of branch points, each
+    # the cells placed by propagation, the cell branched on and its untried candidates, so it is not limited by Python's
+    # recursion depth. On running out of budget every cell placed is taken back out and stats.aborted is set.
+    def search(self, limit):
+        stats = self.stats
+        node_limit = stats.nodes + self.max_nodes if self.max_nodes is not None else None
+        deadline = time.perf_counter() + self.max_seconds if self.max_seconds is not None else None
+        stack = []
+        trail = []
+        while True:
+            stats.nodes += 1
+            if (node_limit is not None and stats.nodes > node_limit) or (
+                deadline is not None and stats.nodes % CLOCK_INTERVAL == 0 and time.perf_counter() > deadline
+            ):
+                stats.aborted = True
+                self.undo(trail)
+                while stack:
+                    trail, best, _ = stack.pop()
+                    self.undo([best])
+                    self.undo(trail)
+                return
+
+            # branches on the empty cell with the fewest candidates
+            best = None
+            if self.propagate(trail):
+                best_mask = 0
+                best_count = self.row_length + 1
+                for row, col in self.empty:
+                    if not self.board[row][col]:
+                        mask = self.candidates.get(row, col)
+                        count = mask.bit_count()
+                        if count < best_count:
+                            best = (row, col)
+                            best_mask = mask
+                            best_count = count
+                if best is None:
+                    self.found += 1
+                    if self.solution is None:
+                        self.solution = [list(row) for row in self.board]
+            if best is not None:
+                stack.append((trail, best, best_mask))
+            else:
+                self.undo(trail)
+
+            # Takes back the last branch tried and moves on to the next candidate, leaving spent branch points. Once limit
+            # solutions have been found the stack is only unwound, which does not count as backtracking.
+            searching = self.found < limit
+            while stack:
+                trail, best, mask = stack[-1]
+                row, col = best
+                if self.board[row][col]:
+                    self.undo([best])
+                    stats.backtracks += searching
+                if mask and searching:
+                    low = mask & -mask
+                    stack[-1] = (trail, best, mask ^ low)
+                    stats.checks += 1
+                    self.place(row, col, low.bit_length() - 1)
+                    break
+                stack.pop()
+                self.undo(trail)
+            else:
+                return
+            trail = []
+
+
+# returns the number of solutions of a 2D python list board, counting no further than limit
+def count_solutions(board, limit=2, max_nodes=None, max_seconds=None):
+    return Solver(board, max_nodes, max_seconds).count(limit)
+
+
+# returns a solved copy of a 2D python list board, or None if it has no solution
+def solve(board):
+    return Solver(board).solve()
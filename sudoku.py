@@ -1,5 +1,12 @@
+import atexit
+import os
 import pygame, sys
 from board import *
+from cell import get_font
+from puzzle_pool import PuzzlePool
+
+# File used to keep ready puzzles between launches
+POOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".puzzle_pool.txt")
 
 
 def draw_button(screen, font, text, padding=(0, 0), offset=(0, 0)):
@@ -23,184 +30,219 @@ def draw_button(screen, font, text, padding=(0, 0), offset=(0, 0)):
     return rectangle
 
 
-def draw_game_start(screen):
-    # Set base screen settings
-    title_font = pygame.font.Font(None, 100)
-    button_font = pygame.font.Font(None, 50)
+# Each screen of the game is a scene. Scenes are built once and reused: enter() paints the scene when it is shown, and
+# handle() takes one event and returns the name of the next scene with the arguments for its enter(), or None to stay.
+class Scene:
+    def __init__(self, screen):
+        self.screen = screen
 
-    screen.fill(BG_COLOR)
+    def enter(self):
+        pass
 
-    # Draw title
-    title_surface = title_font.render("Sudoku", 1, LINE_COLOR)
-    title_rect = title_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 150))
-    screen.blit(title_surface, title_rect)
+    def handle(self, event):
+        return None
 
-    # Draw difficulty buttons
-    easy_rect = draw_button(screen, button_font, "Easy", (45, 30), (0, 0))
-    medium_rect = draw_button(screen, button_font, "Medium", (45, 30), (0, 100))
-    hard_rect = draw_button(screen, button_font, "Hard", (45, 30), (0, 200))
 
-    pygame.display.flip()
+# A scene that never changes while shown, such as a menu or end screen. It is painted once into a background surface,
+# which is blitted back every time the scene is shown again.
+class StaticScene(Scene):
+    def __init__(self, screen):
+        super().__init__(screen)
+        self.background = None
+        self.buttons = {}
 
-    # Return difficult based on button pressed
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if easy_rect.collidepoint(event.pos):
-                    return "Easy"
-                if medium_rect.collidepoint(event.pos):
-                    return "Medium"
-                if hard_rect.collidepoint(event.pos):
-                    return "Hard"
+    # paints the scene on the screen and fills in self.buttons with the rect of each button
+    def paint(self):
+        pass
 
+    def enter(self):
+        if self.background is None:
+            self.paint()
+            self.background = self.screen.copy()
+        else:
+            self.screen.blit(self.background, (0, 0))
+        pygame.display.flip()
 
-def draw_game_main(screen, difficulty):
-    # Set base screen settings
-    button_font = pygame.font.Font(None, 30)
+    # returns the name of the button at pos, or None
+    def button_at(self, pos):
+        for name, rect in self.buttons.items():
+            if rect.collidepoint(pos):
+                return name
+        return None
 
-    screen.fill(BG_COLOR)
+    # Draws a title with buttons below it, 100 pixels apart.
+    def paint_menu(self, title, buttons):
+        title_font = get_font(100)
+        button_font = get_font(50)
 
-    # Create board object
-    board = Board(WIDTH, HEIGHT, screen, difficulty)
-    board.draw()
+        self.screen.fill(BG_COLOR)
 
-    # Draw buttons
-    reset_rect = draw_button(screen, button_font, "Reset", (50, 20), (-150, 270))
-    restart_rect = draw_button(screen, button_font, "Restart", (50, 20), (0, 270))
-    exit_rect = draw_button(screen, button_font, "Exit", (50, 20), (150, 270))
+        # Draw title
+        title_surface = title_font.render(title, 1, LINE_COLOR)
+        title_rect = title_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 150))
+        self.screen.blit(title_surface, title_rect)
 
-    pygame.display.flip()
+        # Draw buttons
+        for i, name in enumerate(buttons):
+            self.buttons[name] = draw_button(self.screen, button_font, name, (45, 30), (0, i * 100))
 
-    selected_row, selected_col = 0, 0
 
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    if reset_rect.collidepoint(event.pos):
-                        board.reset_to_original()
-                        pygame.display.flip()
-                    elif restart_rect.collidepoint(event.pos):
-                        return False, None
-                    elif exit_rect.collidepoint(event.pos):
-                        sys.exit()
-                    else:
-                        selected_cell = board.click(*event.pos)
-                        if selected_cell:
-                            selected_row, selected_col = selected_cell
-                            board.select(selected_row, selected_col)
-                            pygame.display.flip()
-            if event.type == pygame.KEYDOWN:
-                # Handle arrow keys
-                if event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN):
-                    if event.key == pygame.K_LEFT:
-                        selected_col = (selected_col - 1) % 9
-                    elif event.key == pygame.K_RIGHT:
-                        selected_col = (selected_col + 1) % 9
-                    elif event.key == pygame.K_UP:
-                        selected_row = (selected_row - 1) % 9
-                    elif event.key == pygame.K_DOWN:
-                        selected_row = (selected_row + 1) % 9
-
-                    # Update the selection
-                    board.select(selected_row, selected_col)
-                    pygame.display.flip()
-
-                # Set sketched number
-                elif event.unicode.isnumeric():
-                    board.sketch(int(event.unicode))
-                    board.draw()
-                    pygame.display.flip()
-                # Enter sketched number into cell
-                elif event.key == pygame.K_RETURN:
-                    board.place_number()
-                    pygame.display.flip()
-
-                    # Check for win condition
-                    if board.is_full():
-                        return True, board.check_board()
-                # Remove number in cell
-                elif event.key == pygame.K_DELETE or event.key == pygame.K_BACKSPACE:
-                    board.clear()
-                    pygame.display.flip()
-
-
-
-def draw_game_won(screen):
-    # Set base screen settings
-    title_font = pygame.font.Font(None, 100)
-    button_font = pygame.font.Font(None, 50)
-
-    screen.fill(BG_COLOR)
-
-    # Draw title
-    title_surface = title_font.render("Game Won!", 1, LINE_COLOR)
-    title_rect = title_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 150))
-    screen.blit(title_surface, title_rect)
-
-    # Draw button
-    exit_rect = draw_button(screen, button_font, "Exit", (45, 30), (0, 0))
-
-    pygame.display.flip()
+class StartScene(StaticScene):
+    def paint(self):
+        self.paint_menu("Sudoku", ["Easy", "Medium", "Hard"])
 
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if exit_rect.collidepoint(event.pos):
-                    sys.exit()
+    # Starts a game of the difficulty whose button was pressed
+    def handle(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            difficulty = self.button_at(event.pos)
+            if difficulty:
+                return "game", difficulty
+        return None
 
 
-def draw_game_over(screen):
-    # Set base screen settings
-    title_font = pygame.font.Font(None, 100)
-    button_font = pygame.font.Font(None, 50)
+class WonScene(StaticScene):
+    def paint(self):
+        self.paint_menu("Game Won!", ["Exit"])
 
-    screen.fill(BG_COLOR)
+    def handle(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN and self.button_at(event.pos):
+            sys.exit()
+        return None
 
-    # Draw title
-    title_surface = title_font.render("Game Over :(", 1, LINE_COLOR)
-    title_rect = title_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 150))
-    screen.blit(title_surface, title_rect)
 
-    # Draw button
-    restart_rect = draw_button(screen, button_font, "Restart", (45, 30), (0, 0))
+class OverScene(StaticScene):
+    def paint(self):
+        self.paint_menu("Game Over :(", ["Restart"])
 
-    pygame.display.flip()
+    def handle(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN and self.button_at(event.pos):
+            return ("start",)
+        return None
 
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if restart_rect.collidepoint(event.pos):
-                    return
 
+class GameScene(Scene):
+    def __init__(self, screen, pool=None):
+        super().__init__(screen)
+        self.pool = pool
+        self.board = None
+        self.selected_row, self.selected_col = 0, 0
 
-def main():
-    # Loop until player exits
-    while True:
-        game_over = False
-        win = False
+    def enter(self, difficulty):
+        # Set base screen settings
+        button_font = get_font(30)
 
-        pygame.init()
-        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        self.screen.fill(BG_COLOR)
 
-        # Loop until game is over
-        while not game_over:
-            difficulty = draw_game_start(screen)
+        # Create board object
+        self.board = Board(WIDTH, HEIGHT, self.screen, difficulty, self.pool)
+        self.board.draw()
 
-            game_over, win = draw_game_main(screen, difficulty)
+        # Draw buttons
+        self.reset_rect = draw_button(self.screen, button_font, "Reset", (50, 20), (-150, 270))
+        self.restart_rect = draw_button(self.screen, button_font, "Restart", (50, 20), (0, 270))
+        self.exit_rect = draw_button(self.screen, button_font, "Exit", (50, 20), (150, 270))
 
-        if win:
-            draw_game_won(screen)
-        else:
-            draw_game_over(screen)
+        pygame.display.flip()
+
+        self.selected_row, self.selected_col = 0, 0
+
+    def handle(self, event):
+        board = self.board
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:
+                if self.reset_rect.collidepoint(event.pos):
+                    board.reset_to_original()
+                elif self.restart_rect.collidepoint(event.pos):
+                    return ("start",)
+                elif self.exit_rect.collidepoint(event.pos):
+                    sys.exit()
+                else:
+                    selected_cell = board.click(*event.pos)
+                    if selected_cell:
+                        self.selected_row, self.selected_col = selected_cell
+                        board.select(self.selected_row, self.selected_col)
+        if event.type == pygame.KEYDOWN:
+            # Handle arrow keys
+            if event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN):
+                if event.key == pygame.K_LEFT:
+                    self.selected_col = (self.selected_col - 1) % board.size
+                elif event.key == pygame.K_RIGHT:
+                    self.selected_col = (self.selected_col + 1) % board.size
+                elif event.key == pygame.K_UP:
+                    self.selected_row = (self.selected_row - 1) % board.size
+                elif event.key == pygame.K_DOWN:
+                    self.selected_row = (self.selected_row + 1) % board.size
+
+                # Update the selection
+                board.select(self.selected_row, self.selected_col)
+
+            # Undo and redo moves with Ctrl+Z and Ctrl+Y
+            elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+                board.undo()
+            elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+                board.redo()
+
+            # Sketch the next number that can be found by logic alone into its cell with H, and show or hide pencil
+            # marks with P
+            elif event.key == pygame.K_h:
+                hint = board.hint()
+                if hint:
+                    self.selected_row, self.selected_col, value, _ = hint
+                    board.select(self.selected_row, self.selected_col)
+                    board.sketch(value)
+            elif event.key == pygame.K_p:
+                board.toggle_candidates()
+
+            # Set sketched number
+            elif event.unicode.isnumeric():
+                board.sketch(int(event.unicode))
+            # Enter sketched number into cell
+            elif event.key == pygame.K_RETURN:
+                board.place_number()
+
+                # Check for win condition
+                if board.is_full():
+                    return ("won",) if board.check_board() else ("over",)
+            # Remove number in cell
+            elif event.key == pygame.K_DELETE or event.key == pygame.K_BACKSPACE:
+                board.clear()
+        board.update_display()
+        return None
+
+
+def main():
+    # Start building puzzles in the background, and keep whatever is left over for the next launch
+    pool = PuzzlePool(path=POOL_PATH)
+    pool.start()
+    atexit.register(pool.save)
+
+    # pygame and the window are set up once and kept for every game
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+    # Only the events the scenes use are queued, so mouse movement does not wake the loop
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed([pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN])
+
+    scenes = {
+        "start": StartScene(screen),
+        "game": GameScene(screen, pool),
+        "won": WonScene(screen),
+        "over": OverScene(screen),
+    }
+    scene = scenes["start"]
+    scene.enter()
+
+    # Loop until player exits. The loop sleeps in event.wait() until there is input, so an idle game uses no CPU.
+    while True:
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            sys.exit()
+        result = scene.handle(event)
+        if result:
+            name, *args = result
+            scene = scenes[name]
+            scene.enter(*args)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,39 @@
 import math
 import random
+import time
+from candidates import Candidates
+from solver import CLOCK_INTERVAL, SearchStats, Solver
+
+# number of cells removed for each difficulty offered by the game
+DIFFICULTIES = {"Easy": 30, "Medium": 40, "Hard": 50}
+
+# fill_values gives up after this many restarts
+MAX_RESTARTS = 100
 
 
 class SudokuGenerator:
     
-    # class constructor to create board
-    def __init__(self, row_length, removed_cells):
+    # class constructor to create board. When unique is True, remove_cells only blanks cells that keep the puzzle
+    # uniquely solvable. Each generator draws from its own random.Random(seed), so the same seed and settings always
+    # give the same puzzle.
+    #
+    # max_nodes and max_seconds cap every search: each attempt at filling the board and each uniqueness check. When a
+    # fill runs out of either, fill_values clears the board and starts again from a new seed drawn from the current one,
+    # so results stay reproducible, and a uniqueness check that runs out keeps the cell. hook, if given, is called with
+    # self.stats after every search.
+    def __init__(self, row_length, removed_cells, unique=False, seed=None, max_nodes=None, max_seconds=None, hook=None):
         self.row_length = row_length
         self.removed_cells = removed_cells
+        self.unique = unique
+        self.seed = seed
+        self.random = random.Random(seed)
         self.box_length = int(math.sqrt(row_length))
         self.board = [[0 for i in range(row_length)] for i in range(row_length)]
+        self.candidates = Candidates(row_length)
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.hook = hook
+        self.stats = SearchStats()
     
     # returns a 2D python list of numbers which represents the board
     def get_board(self):
@@ -34,80 +58,207 @@ class SudokuGenerator:
                 return False
         return True
 
-    # determines if num is contained in the 3x3 box specified on the board
+    # determines if num is contained in the box specified on the board
     def valid_in_box(self, row_start, col_start, num):
-        for row in range(3):
-            for col in range(3):
+        for row in range(self.box_length):
+            for col in range(self.box_length):
                 if self.board[row_start + row][col_start + col] == num:
                     return False
         return True
     
-    # Determines if it is valid to enter num at (row, col) in the board
+    # Determines if it is valid to enter num at (row, col) in the board, using the row, column and box bitmasks
     def is_valid(self, row, col, num):
-        return(self.valid_in_row(row, num) and self.valid_in_col(col, num) and self.valid_in_box(row - row % 3, col - col % 3, num))
+        return self.candidates.is_valid(row, col, num)
+
+    # enters num at (row, col) and records it in the bitmasks
+    def place(self, row, col, num):
+        self.board[row][col] = num
+        self.candidates.place(row, col, num)
+
+    # empties (row, col) and removes its value from the bitmasks
+    def unplace(self, row, col):
+        self.candidates.remove(row, col, self.board[row][col])
+        self.board[row][col] = 0
 
-    # fills the specified 3x3 box with values
+    # fills the specified box with a shuffled permutation of the numbers
     def fill_box(self, row_start, col_start):
-        for i in range(3):
-            for j in range(3):
-                while True:
-                    num = self.randomNumber(self.row_length)
-                    if self.valid_in_box(row_start, col_start, num):
-                        break
-                self.board[row_start+i][col_start+j] = num
-                
+        nums = list(range(1, self.row_length + 1))
+        self.random.shuffle(nums)
+        for i in range(self.box_length):
+            for j in range(self.box_length):
+                self.place(row_start + i, col_start + j, nums[i * self.box_length + j])
+
     # returns a random number
     def randomNumber(self, value):
-        return random.randint(1, value)
+        return self.random.randint(1, value)
     
-    # fills the three boxes along the main diagonal of the board
+    # fills the boxes along the main diagonal of the board
     def fill_diagonal(self):
-        for i in range(0, self.row_length, 3):
+        for i in range(0, self.row_length, self.box_length):
             self.fill_box(i, i)
 
-    # fills the remaining cells of the board
+    # Fills the remaining cells of the board from (row, col) on, skipping the boxes on the diagonal, by depth-first
+    # search in row order with the smallest candidate tried first. The search keeps its own stack of the untried
+    # candidates of each filled cell, so it is not limited by Python's recursion depth. Returns False if the board
+    # cannot be completed or the node or time budget ran out, which sets self.stats.aborted.
     def fill_remaining(self, row, col):
-        if (col >= self.row_length and row < self.row_length - 1):
-            row += 1
-            col = 0
-        if row >= self.row_length and col >= self.row_length:
-            return True
-        if row < self.box_length:
-            if col < self.box_length:
-                col = self.box_length
-        elif row < self.row_length - self.box_length:
-            if col == int(row // self.box_length * self.box_length):
-                col += self.box_length
-        else:
-            if col == self.row_length - self.box_length:
-                row += 1
-                col = 0
-                if row >= self.row_length:
-                    return True
-        
-        for num in range(1, self.row_length + 1):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.fill_remaining(row, col + 1):
-                    return True
-                self.board[row][col] = 0
-        return False
-
-    # constructs a solution by calling fill_diagonal and fill_remaining
+        cells = [
+            (i, j)
+            for i in range(row, self.row_length)
+            for j in range(col if i == row else 0, self.row_length)
+            if i // self.box_length != j // self.box_length
+        ]
+        stats = self.stats
+        stats.aborted = False
+        start = time.perf_counter()
+        deadline = start + self.max_seconds if self.max_seconds is not None else None
+        node_limit = stats.nodes + self.max_nodes if self.max_nodes is not None else None
+
+        stack = []
+        mask = None
+        filled = False
+        while True:
+            if len(stack) == len(cells):
+                filled = True
+                break
+            i, j = cells[len(stack)]
+            if mask is None:
+                mask = self.candidates.get(i, j)
+                stats.nodes += 1
+                if node_limit is not None and stats.nodes > node_limit:
+                    stats.aborted = True
+                    break
+                if deadline is not None and stats.nodes % CLOCK_INTERVAL == 0 and time.perf_counter() > deadline:
+                    stats.aborted = True
+                    break
+            if mask:
+                low = mask & -mask
+                mask ^= low
+                stats.checks += 1
+                self.place(i, j, low.bit_length() - 1)
+                stack.append(mask)
+                mask = None
+            elif stack:
+                mask = stack.pop()
+                stats.backtracks += 1
+                self.unplace(*cells[len(stack)])
+            else:
+                break
+
+        stats.elapsed += time.perf_counter() - start
+        if self.hook is not None:
+            self.hook(stats)
+        return filled
+
+    # returns a Solver for the board that shares this generator's budget, stats and hook
+    def solver(self):
+        return Solver(self.board, self.max_nodes, self.max_seconds, self.stats, self.hook)
+
+    # Fills the remaining cells with the propagating solver, which branches on the most constrained cell instead of
+    # walking the board in a fixed order. Needed from 16x16 up, where fill_remaining blows up. Returns False if the
+    # board cannot be completed or the budget ran out, which sets self.stats.aborted.
+    def fill_remaining_propagate(self):
+        solution = self.solver().solve()
+        if solution is None:
+            return False
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                if not self.board[row][col]:
+                    self.place(row, col, solution[row][col])
+        return True
+
+    # empties every cell of the board
+    def clear(self):
+        self.board = [[0 for i in range(self.row_length)] for i in range(self.row_length)]
+        self.candidates = Candidates(self.row_length)
+
+    # constructs a solution by calling fill_diagonal and then fill_remaining, or fill_remaining_propagate for boards
+    # other than 9x9. On 4x4 boards some diagonals cannot be completed, so the board is cleared and tried again. When a
+    # fill runs out of budget, the board is cleared and refilled from a new seed.
     def fill_values(self):
+        if self.box_length == 3:
+            fill = lambda: self.fill_remaining(0, self.box_length)
+        else:
+            fill = self.fill_remaining_propagate
         self.fill_diagonal()
-        self.fill_remaining(0, 3)
+        while not fill():
+            if self.stats.aborted:
+                if self.stats.restarts >= MAX_RESTARTS:
+                    raise RuntimeError("no board filled within %d restarts" % MAX_RESTARTS)
+                self.stats.restarts += 1
+                self.random = random.Random(self.random.getrandbits(64))
+            elif self.box_length == 3:
+                raise RuntimeError("the diagonal boxes cannot be completed")
+            self.clear()
+            self.fill_diagonal()
 
     # removes the appropriate number of cells from the board
     def remove_cells(self):
+        if self.unique:
+            self.remove_cells_unique()
+            return
+
+        cells = [(i, j) for i in range(self.row_length) for j in range(self.row_length) if self.board[i][j] != 0]
+        self.random.shuffle(cells)
+
+        for i, j in cells[: self.removed_cells]:
+            self.unplace(i, j)
+
+    # returns True if the puzzle still has exactly one solution after emptying (i, j), which held value
+    def keeps_unique(self, i, j, value):
+        # a cell whose value is its only candidate can always be filled back in, so the search is skipped
+        return self.candidates.get(i, j) == 1 << value or (self.solver().count(2) == 1 and not self.stats.aborted)
+
+    # Removes cells in random order, keeping a removal only if the puzzle still has exactly one solution. The
+    # solution counter stops at 2, so a rejected cell costs very little, and a count that runs out of budget rejects the
+    # cell. If every cell has been tried before enough have been removed, the board is left with as many blanks as
+    # uniqueness allows.
+    def remove_cells_unique(self):
+        num = self.removed_cells
+        cells = [(i, j) for i in range(self.row_length) for j in range(self.row_length) if self.board[i][j] != 0]
+        self.random.shuffle(cells)
+
+        for i, j in cells:
+            if num == 0:
+                break
+            value = self.board[i][j]
+            self.unplace(i, j)
+            if self.keeps_unique(i, j, value):
+                num -= 1
+            else:
+                self.place(i, j, value)
+
+    # Removes cells like remove_cells_unique, then goes on removing them while grade(board) is below low, putting back
+    # any cell whose removal would take it above high. grade is any function from a board to a level, such as the
+    # grader's, so the generator does not depend on it. Returns the level reached, or None if the puzzle graded above
+    # high from the start or ran out of cells below low.
+    def remove_cells_graded(self, grade, low, high):
         num = self.removed_cells
-        
-        while (num != 0):
-            i = self.randomNumber(self.row_length) - 1
-            j = self.randomNumber(self.row_length) - 1
-            if (self.board[i][j] != 0):
+        level = None
+        cells = [(i, j) for i in range(self.row_length) for j in range(self.row_length) if self.board[i][j] != 0]
+        self.random.shuffle(cells)
+
+        for i, j in cells:
+            if num == 0 and level is None:
+                level = grade(self.board)
+            if level is not None and level >= low:
+                break
+            value = self.board[i][j]
+            self.unplace(i, j)
+            if not self.keeps_unique(i, j, value):
+                self.place(i, j, value)
+            elif num:
                 num -= 1
-                self.board[i][j] = 0
+            else:
+                new_level = grade(self.board)
+                if new_level > high:
+                    self.place(i, j, value)
+                else:
+                    level = new_level
+
+        if level is None:
+            level = grade(self.board)
+        return level if low <= level <= high else None
 
 '''
 Given a number of rows and number of cells to remove, this function:
@@ -115,9 +266,11 @@ Given a number of rows and number of cells to remove, this function:
 2. fills its values and saves this as the solved state
 3. removes the appropriate number of cells
 4. returns the representative 2D Python Lists of the board and solution
+If unique is True, only cells that keep the puzzle uniquely solvable are removed. Passing the same seed gives the same
+board every time.
 '''
-def generate_sudoku(size, removed):
-    sudoku = SudokuGenerator(size, removed)
+def generate_sudoku(size, removed, unique=False, seed=None):
+    sudoku = SudokuGenerator(size, removed, unique, seed)
     sudoku.fill_values()
     board = sudoku.get_board()
     sudoku.remove_cells()
@@ -125,4 +278,24 @@ def generate_sudoku(size, removed):
     return board
 
 
+# Same as generate_sudoku, but also returns the solved board as a second 2D python list. max_nodes and max_seconds cap
+# each search, as in SudokuGenerator.
+def generate_sudoku_with_solution(size, removed, unique=False, seed=None, max_nodes=None, max_seconds=None):
+    sudoku = SudokuGenerator(size, removed, unique, seed, max_nodes, max_seconds)
+    sudoku.fill_values()
+    solution = [row[:] for row in sudoku.get_board()]
+    sudoku.remove_cells()
+    return sudoku.get_board(), solution
+
+
+# converts a 9x9 board to an 81 character string, read row by row, with 0 for empty cells
+def board_to_string(board):
+    return "".join(str(num) for row in board for num in row)
+
 
+# converts an 81 character string back to a 9x9 board. Both 0 and . are read as empty cells.
+def string_to_board(text):
+    text = text.strip().replace(".", "0")
+    if len(text) != 81 or not text.isdigit():
+        raise ValueError("expected 81 digits, got %r" % text)
+    return [[int(text[row * 9 + col]) for col in range(9)] for row in range(9)]
@@ -0,0 +1,13 @@
+# Techniques from easiest to hardest. A puzzle's level is the 1-based position of the hardest technique it needed, and
+# GUESSING means the techniques below were not enough to finish it. Kept apart from grader so the game can name the
+# technique behind a hint without loading the grader and its batch tooling.
+TECHNIQUES = ["Naked single", "Hidden single", "Naked pair", "Hidden pair", "Pointing", "Box-line reduction"]
+NAKED_SINGLE, HIDDEN_SINGLE, NAKED_PAIR, HIDDEN_PAIR, POINTING, BOX_LINE = range(1, 7)
+GUESSING = len(TECHNIQUES) + 1
+
+# The levels a puzzle of each difficulty must grade at, lowest and highest, when puzzles are chosen by grade
+GRADE_BANDS = {
+    "Easy": (NAKED_SINGLE, NAKED_SINGLE),
+    "Medium": (HIDDEN_SINGLE, HIDDEN_SINGLE),
+    "Hard": (NAKED_PAIR, GUESSING),
+}
@@ -0,0 +1,130 @@
+import argparse
+import math
+import random
+import sys
+from grader import grade
+from solver import count_solutions, solve
+from sudoku_generator import DIFFICULTIES, board_to_string, generate_sudoku_with_solution, string_to_board
+
+
+# Returns a random symmetry of a size x size board as a (transpose, rows, cols, numbers) tuple: whether to transpose,
+# the source row and column for each output row and column, and the new name of each number. Bands and stacks are
+# shuffled as a whole and rows and columns only within them, so every transform keeps a valid board valid. Rotations
+# and reflections are among these, since a rotation is a transpose followed by reversing the row order.
+def random_transform(rng, size=9):
+    box_length = math.isqrt(size)
+
+    def order():
+        return [
+            band * box_length + offset
+            for band in rng.sample(range(box_length), box_length)
+            for offset in rng.sample(range(box_length), box_length)
+        ]
+
+    return rng.random() < 0.5, order(), order(), [0] + rng.sample(range(1, size + 1), size)
+
+
+# returns a new board with transform applied to board. Empty cells stay empty.
+def apply_transform(board, transform):
+    transpose, rows, cols, numbers = transform
+    if transpose:
+        return [[numbers[board[col][row]] for col in cols] for row in rows]
+    return [[numbers[board[row][col]] for col in cols] for row in rows]
+
+
+# Hands out puzzles derived from a few verified seed puzzles per difficulty by random symmetry transforms. A derived
+# puzzle has a single solution and the same technique grade as its seed, and costs microseconds instead of a full
+# generation, so this can stand in for a PuzzlePool when creating a Board. Derived puzzles all share their seed's
+# canonical form, so canonical.PuzzleIndex treats them as duplicates of each other.
+#
+# Seed puzzles are taken from source (a PuzzlePool or PuzzleBank) if one is given, or generated otherwise, the first
+# time a difficulty is asked for.
+class PuzzleMultiplier:
+
+    # class constructor. seeds is the number of seed puzzles kept per difficulty and seed makes the transforms
+    # reproducible.
+    def __init__(self, source=None, seeds=1, seed=None):
+        self.source = source
+        self.seed_count = seeds
+        self.random = random.Random(seed)
+        self.seeds = {}
+
+    # Checks that puzzle has solution as its only solution and adds it as a seed for difficulty. Returns its grade.
+    def add_seed(self, difficulty, puzzle, solution):
+        if count_solutions(puzzle, 2) != 1 or solve(puzzle) != solution:
+            raise ValueError("seed puzzle does not have a single solution matching the one given")
+        level = grade(puzzle).level
+        self.seeds.setdefault(difficulty, []).append((puzzle, solution, level))
+        return level
+
+    # returns the (puzzle, solution, grade) seeds for difficulty, building them the first time
+    def seeds_for(self, difficulty):
+        seeds = self.seeds.get(difficulty, [])
+        while len(seeds) < self.seed_count:
+            if self.source is not None:
+                puzzle, solution = self.source.take(difficulty)
+            else:
+                puzzle, solution = generate_sudoku_with_solution(
+                    9, DIFFICULTIES[difficulty], True, self.random.getrandbits(64)
+                )
+            self.add_seed(difficulty, puzzle, solution)
+            seeds = self.seeds[difficulty]
+        return seeds
+
+    # returns a (puzzle, solution, grade) triple derived from a random seed of difficulty
+    def derive(self, difficulty):
+        puzzle, solution, level = self.random.choice(self.seeds_for(difficulty))
+        transform = random_transform(self.random, len(puzzle))
+        return apply_transform(puzzle, transform), apply_transform(solution, transform), level
+
+    # returns a (puzzle, solution) pair for difficulty
+    def take(self, difficulty):
+        puzzle, solution, _ = self.derive(difficulty)
+        return puzzle, solution
+
+
+# Command line entry point. Reads seed puzzles in the format written by batch.py and writes count derived puzzles for
+# each of them in the same format. Derived puzzles keep the seed's difficulty and grade, and their seed field is 0,
+# since they cannot be rebuilt from a generator seed.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Derive new Sudoku puzzles from seed puzzles by symmetry transforms.")
+    parser.add_argument("source", help="text file of seed puzzles")
+    parser.add_argument("-n", "--count", type=int, default=100, help="puzzles derived from each seed")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="seed for the transforms")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        with open(args.source) as text:
+            for line in text:
+                fields = line.strip().split(",")
+                if not fields[0]:
+                    continue
+                puzzle = string_to_board(fields[0])
+                solution = solve(puzzle)
+                if solution is None or count_solutions(puzzle, 2) != 1:
+                    raise ValueError("seed puzzle %s does not have a single solution" % fields[0])
+                if len(fields) > 1 and fields[1] and string_to_board(fields[1]) != solution:
+                    raise ValueError("the solution given for seed puzzle %s is not its solution" % fields[0])
+                difficulty = fields[2] if len(fields) > 2 else ""
+                level = int(fields[3]) if len(fields) > 3 and fields[3] else grade(puzzle).level
+                for _ in range(args.count):
+                    transform = random_transform(rng)
+                    out.write(
+                        "%s,%s,%s,%d,0\n"
+                        % (
+                            board_to_string(apply_transform(puzzle, transform)),
+                            board_to_string(apply_transform(solution, transform)),
+                            difficulty,
+                            level,
+                        )
+                    )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import mmap
+import os
+import numpy as np
+from puzzle_bank import GRID_SIZE, HEADER, HEADER_SIZE, MAGIC, RECORD_SIZE, VERSION
+
+# Error flags, combined into one mask per puzzle. A mask of 0 means the puzzle is sound.
+BAD_VALUE = 1  # a cell of the puzzle or solution is outside 0-9
+PUZZLE_CONFLICT = 2  # a given number is repeated in a row, column or box of the puzzle
+INCOMPLETE = 4  # the solution has empty cells
+ROW_ERROR = 8  # a row of the solution does not hold each number once
+COL_ERROR = 16  # a column of the solution does not hold each number once
+BOX_ERROR = 32  # a box of the solution does not hold each number once
+GIVEN_MISMATCH = 64  # a given number differs from the solution
+BAD_LENGTH = 128  # the puzzle or solution of a text line is not 81 characters long
+ERRORS = {
+    BAD_VALUE: "Bad value",
+    PUZZLE_CONFLICT: "Puzzle conflict",
+    INCOMPLETE: "Incomplete solution",
+    ROW_ERROR: "Row error",
+    COL_ERROR: "Column error",
+    BOX_ERROR: "Box error",
+    GIVEN_MISMATCH: "Given mismatch",
+    BAD_LENGTH: "Bad length",
+}
+
+# the bit pattern of a unit that holds every number from 1 to 9 once
+FULL_UNIT = 0x3FE
+
+
+# Returns the units of (N, 9, 9) grids as an (N, 27, 9) array: the 9 rows, then the 9 columns, then the 9 boxes.
+def units(grids):
+    boxes = grids.reshape(-1, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(-1, 9, 9)
+    return np.concatenate((grids, grids.transpose(0, 2, 1), boxes), axis=1)
+
+
+# Checks an (N, 9, 9) array of puzzles against an (N, 9, 9) array of solutions and returns an (N,) array of error
+# masks. Every check is done on whole arrays, with puzzles processed chunk_size at a time to bound memory.
+def validate(puzzles, solutions, chunk_size=65536):
+    puzzles = np.asarray(puzzles, dtype=np.uint8).reshape(-1, 9, 9)
+    solutions = np.asarray(solutions, dtype=np.uint8).reshape(-1, 9, 9)
+    masks = np.zeros(len(puzzles), dtype=np.uint8)
+    for start in range(0, len(puzzles), chunk_size):
+        stop = start + chunk_size
+        masks[start:stop] = validate_chunk(puzzles[start:stop], solutions[start:stop])
+    return masks
+
+
+# validates one chunk of puzzles and solutions
+def validate_chunk(puzzles, solutions):
+    masks = np.zeros(len(puzzles), dtype=np.uint8)
+    bad = (puzzles > 9).any(axis=(1, 2)) | (solutions > 9).any(axis=(1, 2))
+    masks[bad] |= BAD_VALUE
+    puzzles = np.minimum(puzzles, 9)
+    solutions = np.minimum(solutions, 9)
+
+    # Each number n of a unit becomes the bit 1 << n, with empty cells dropped. Adding the bits of a unit gives the
+    # same as or-ing them only when no number is repeated.
+    bits = np.left_shift(1, units(puzzles).astype(np.uint16)) & ~np.uint16(1)
+    repeats = bits.sum(axis=2, dtype=np.uint16) != np.bitwise_or.reduce(bits, axis=2)
+    masks[repeats.any(axis=1)] |= PUZZLE_CONFLICT
+
+    masks[(solutions == 0).any(axis=(1, 2))] |= INCOMPLETE
+
+    # Each unit of the solution is reduced to the bit pattern of the numbers it holds, which must be FULL_UNIT.
+    bits = np.bitwise_or.reduce(np.left_shift(1, units(solutions).astype(np.uint16)), axis=2) != FULL_UNIT
+    masks[bits[:, :9].any(axis=1)] |= ROW_ERROR
+    masks[bits[:, 9:18].any(axis=1)] |= COL_ERROR
+    masks[bits[:, 18:].any(axis=1)] |= BOX_ERROR
+
+    masks[((puzzles != 0) & (puzzles != solutions)).any(axis=(1, 2))] |= GIVEN_MISMATCH
+    return masks
+
+
+# Returns the puzzles and solutions of a bank file as two (N, 9, 9) arrays, unpacking the nibbles of every record at
+# once.
+def load_bank(path):
+    if os.path.getsize(path) < HEADER_SIZE:
+        raise ValueError("%s is not a puzzle bank" % path)
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, version, record_size, _ = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError("%s is not a puzzle bank" % path)
+        count = (len(data) - HEADER_SIZE) // RECORD_SIZE
+        records = np.frombuffer(data, dtype=np.uint8, count=count * RECORD_SIZE, offset=HEADER_SIZE)
+        records = records.reshape(count, RECORD_SIZE)[:, : 2 * GRID_SIZE].copy()
+
+    def unpack(packed):
+        cells = np.empty((count, 2 * GRID_SIZE), dtype=np.uint8)
+        cells[:, 0::2] = packed >> 4
+        cells[:, 1::2] = packed & 15
+        return cells[:, :81].reshape(count, 9, 9)
+
+    return unpack(records[:, :GRID_SIZE]), unpack(records[:, GRID_SIZE:])
+
+
+# Returns the puzzles and solutions of a text file of "puzzle,solution,..." lines as two (N, 9, 9) arrays, and an (N,)
+# array of masks with BAD_LENGTH set for every line whose puzzle or solution is not 81 characters. Such a line is read
+# as empty grids, so it cannot shift the lines after it, and its other checks should be ignored. Lines without a
+# solution are skipped.
+def load_text(path):
+    puzzles = []
+    solutions = []
+    masks = []
+    with open(path) as text:
+        for line in text:
+            fields = line.strip().split(",")
+            if len(fields) > 1 and fields[1]:
+                puzzle = fields[0].replace(".", "0").encode()
+                solution = fields[1].replace(".", "0").encode()
+                if len(puzzle) == 81 and len(solution) == 81:
+                    masks.append(0)
+                else:
+                    puzzle = solution = b"0" * 81
+                    masks.append(BAD_LENGTH)
+                puzzles.append(puzzle)
+                solutions.append(solution)
+
+    def parse(lines):
+        return (np.frombuffer(b"".join(lines), dtype=np.uint8) - ord("0")).reshape(-1, 9, 9)
+
+    return parse(puzzles), parse(solutions), np.array(masks, dtype=np.uint8)
+
+
+# returns the names of the errors set in mask
+def error_names(mask):
+    return [name for flag, name in ERRORS.items() if mask & flag]
+
+
+# Command line entry point. Validates a bank or text file and prints how many puzzles have each error, followed by the
+# index and errors of the first few bad puzzles.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every puzzle of a Sudoku puzzle bank or text file.")
+    parser.add_argument("path")
+    parser.add_argument("--text", action="store_true", help="read a text file instead of a bank")
+    parser.add_argument("--show", type=int, default=10, help="bad puzzles to list")
+    args = parser.parse_args(argv)
+
+    if args.text:
+        puzzles, solutions, bad = load_text(args.path)
+        masks = np.where(bad != 0, bad, validate(puzzles, solutions))
+    else:
+        masks = validate(*load_bank(args.path))
+    print("%d puzzles, %d with errors" % (len(masks), np.count_nonzero(masks)))
+    for flag, name in ERRORS.items():
+        print("%-20s %d" % (name, np.count_nonzero(masks & flag)))
+    for k in np.flatnonzero(masks)[: args.show]:
+        print("%d: %s" % (k, ", ".join(error_names(masks[k]))))
+
+
+if __name__ == "__main__":
+    main()